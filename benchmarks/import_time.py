@@ -0,0 +1,66 @@
+"""
+Import-time benchmark of the power package.
+
+Measures `import power` in fresh interpreters and checks that the lazy submodules (Pyomo, pandas)
+are not loaded by it, and that every public name still resolves. Exits with status 1 on a regression.
+
+    python benchmarks/import_time.py --repeat 5 --max-ms 800
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('pyomo.environ', 'pandas')
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import power
+elapsed = time.perf_counter() - start
+heavy = [m for m in %r if m in sys.modules]
+print(json.dumps({'ms': 1000 * elapsed, 'heavy': heavy}))
+""" % (HEAVY,)
+
+NAMES = """
+import json, power, power.models
+from power.models import OPF_models, dispatch_models
+lazy = {m: sorted(names) for m, names in power.models._LAZY.items()}
+actual = {'OPF_models': sorted(OPF_models.__all__), 'dispatch_models': sorted(dispatch_models.__all__)}
+missing = [n for n in power.__all__ if not hasattr(power, n)]
+print(json.dumps({'in_sync': lazy == actual, 'missing': missing}))
+"""
+
+
+def run(code: str) -> dict:
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="Number of fresh interpreters to time")
+    parser.add_argument('--max-ms', type=float, default=None, help="Fail if the median import time is above this")
+    args = parser.parse_args(argv)
+
+    samples = [run(PROBE) for _ in range(args.repeat)]
+    times = sorted(s['ms'] for s in samples)
+    median = times[len(times) // 2]
+    heavy = sorted({m for s in samples for m in s['heavy']})
+    names = run(NAMES)
+
+    print(f"import power: median {median:.1f} ms, min {times[0]:.1f} ms, max {times[-1]:.1f} ms ({args.repeat} runs)")
+    print(f"heavy modules loaded by import power: {heavy or 'none'}")
+    print(f"lazy names in sync: {names['in_sync']}, unresolved public names: {names['missing'] or 'none'}")
+
+    failed = bool(heavy) or not names['in_sync'] or bool(names['missing'])
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"median above the budget of {args.max_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,4 +3,20 @@ from .import models
 __all__ = []
 __all__ += models.__all__
 
-from .models import *
\ No newline at end of file
+# Os nomes de OPF e despacho são resolvidos em power.models no primeiro acesso (ver models._LAZY)
+from .models.electricity_models import *
+from .models.power_flow_models import *
+from .models.contingency_models import *
+from .models.solve_cache import SolveCache
+
+
+def __getattr__(name):
+    if name in models._LAZY_NAMES:
+        value = getattr(models, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
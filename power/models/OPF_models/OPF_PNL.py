@@ -1,17 +1,40 @@
 from pyomo.environ import *
 from power.models.electricity_models import *
+from power.models.electricity_models.network_models.network_arrays import BUS_TYPE_CODES, NetworkArrays
+from power.models.OPF_models.OPF_results import OPFResults
+from power.models.OPF_models.OPF_stats import SolveStats, parse_ipopt_log
+from power.models.solve_cache import SolveCache
+from pyomo.core.expr.visitor import identify_variables
+from dataclasses import replace
+import logging
+import os
+import tempfile
+import time
 import numpy as np
-import pandas as pd
 
 class PNL_OPF:
-    def __init__(self, network: Network, com_rede=True, is_cubic=True):
+    def __init__(self, network: Network, com_rede=True, is_cubic=True, segments=None, hook=None):
+        """
+        Args:
+            network (Network): The network.
+            com_rede (bool): Whether to include the DC network.
+            is_cubic (bool): Cubic (True) or quadratic (False) generation costs.
+            segments (int, optional): Number of segments of a piecewise-linear approximation of the costs
+                between p_min and p_max. With the DC network this turns the model into an LP (e.g. for GLPK).
+                Exact nonlinear costs if None.
+            hook (callable or logging.Logger, optional): Receives the SolveStats of every solver run
+                (a logger gets them at INFO level). The stats are also in self.stats and self.result.stats.
+        """
         if not isinstance(com_rede, bool):
             raise TypeError("O parâmetro 'com_rede' deve ser booleano (True ou False).")
-        #Rede
-        #self.net = network.ACtoDC #Transforma rede AC em DC
+        if segments is not None and (not isinstance(segments, int) or segments < 1):
+            raise ValueError("O parâmetro 'segments' deve ser um inteiro positivo ou None.")
+        #Rede (o modelo usa a projeção DC da rede, network.dc_arrays, sem alterá-la)
         self.net = network
         self.com_rede = com_rede
         self.is_cubic = is_cubic
+        self.segments = segments
+        self.hook = hook
 
         # Generators, Loads, Buses, Lines
         self.generators = self.net.generators
@@ -23,44 +46,77 @@ class PNL_OPF:
         self.model = ConcreteModel()
         self.model.name = 'Otimização do Despacho Termoelétrico com e sem rede DC, Custos Quadráticos e Estimativas de Geração Cúbicas'
 
-        # Constrói o modelo passo a passo
-        self._create_sets()
-        self._create_parameters()
-        self._create_variables()
-        self._create_constraints()
-        self._create_objective()   
+        # Constrói o modelo passo a passo, medindo o tempo de cada fase
+        self._build_phases = {}
+        for step in (self._create_sets, self._create_parameters, self._create_variables,
+                     self._create_constraints, self._create_objective, self._create_suffixes):
+            start = time.perf_counter()
+            step()
+            self._build_phases[step.__name__.lstrip('_')] = time.perf_counter() - start
+
+        # Solver mantido entre chamadas de solve() e estado do warm start
+        self._solvers = {}
+        self._solved = False
+        self._size = None
+        self.stats = None
 
     def _create_sets(self):    
-        self.model.generators = Set(initialize=[g.name for g in self.generators], doc="Conjunto de geradores") # Cria conjunto de geradores com os nomes
-        self.model.loads = Set(initialize=[l.name for l in self.loads], doc="Conjunto de cargas") # Cria conjunto de cargas
-        self.model.buses = Set(initialize=[b.name for b in self.buses], doc="Conjunto de barras")  # Cria conjunto de barras
-        self.model.lines = Set(initialize=[ln.name for ln in self.lines], doc="Conjunto de linhas") # Cria conjunto de linhas    
+        arr = self.net.dc_arrays # Dados da rede DC em pu, em forma de vetores
+        self.model.generators = Set(initialize=arr.gen_names, doc="Conjunto de geradores") # Cria conjunto de geradores com os nomes
+        self.model.loads = Set(initialize=arr.load_names, doc="Conjunto de cargas") # Cria conjunto de cargas
+        self.model.buses = Set(initialize=arr.bus_names, doc="Conjunto de barras")  # Cria conjunto de barras
+        self.model.lines = Set(initialize=arr.line_names, doc="Conjunto de linhas") # Cria conjunto de linhas    
 
     def _create_parameters(self):
         m = self.model
+        arr = self.net.dc_arrays
+        bus_names = np.array(arr.bus_names, dtype=object)
+        bus_types = {v: k for k, v in BUS_TYPE_CODES.items()}
 
         # Generators
-        m.generator_bus = Param(m.generators, initialize={g.name: g.bus.name for g in self.generators}, within=Any)  # Localização dos geradores
-        m.generator_pmax = Param(m.generators, initialize={g.name: g.p_max for g in self.generators}, within=Reals)  # Geração Máxima
-        m.generator_pmin = Param(m.generators, initialize={g.name: g.p_min for g in self.generators}, within=Reals)  # Geração Mínima
-        m.generator_cost_a = Param(m.generators, initialize={g.name: g.cost_a for g in self.generators}, within=Reals)  # Custo a
-        m.generator_cost_b = Param(m.generators, initialize={g.name: g.cost_b for g in self.generators}, within=Reals)  # Custo b
-        m.generator_cost_c = Param(m.generators, initialize={g.name: g.cost_c for g in self.generators}, within=Reals)  # Custo c
+        m.generator_bus = Param(m.generators, initialize=dict(zip(arr.gen_names, bus_names[arr.gen_bus])), within=Any)  # Localização dos geradores
+        m.generator_pmax = Param(m.generators, initialize=dict(zip(arr.gen_names, arr.gen_p_max.tolist())), within=Reals, mutable=True)  # Geração Máxima
+        m.generator_pmin = Param(m.generators, initialize=dict(zip(arr.gen_names, arr.gen_p_min.tolist())), within=Reals, mutable=True)  # Geração Mínima
+        m.generator_cost_a = Param(m.generators, initialize=dict(zip(arr.gen_names, arr.gen_cost_a.tolist())), within=Reals, mutable=True)  # Custo a
+        m.generator_cost_b = Param(m.generators, initialize=dict(zip(arr.gen_names, arr.gen_cost_b.tolist())), within=Reals, mutable=True)  # Custo b
+        m.generator_cost_c = Param(m.generators, initialize=dict(zip(arr.gen_names, arr.gen_cost_c.tolist())), within=Reals, mutable=True)  # Custo c
 
         # Loads
-        m.load_bus = Param(m.loads, initialize={l.name: l.bus.name for l in self.loads}, within=Any)
-        m.load_p = Param(m.loads, initialize={l.name: l.p for l in self.loads}, within=Reals)
+        m.load_bus = Param(m.loads, initialize=dict(zip(arr.load_names, bus_names[arr.load_bus])), within=Any)
+        self._create_load_parameters()
 
         # Lines
-        m.line_from = Param(m.lines, initialize={ln.name: ln.from_bus.name for ln in self.lines}, within=Any)  # Barra de
-        m.line_to = Param(m.lines, initialize={ln.name: ln.to_bus.name for ln in self.lines}, within=Any)      # Barra para
-        m.line_x = Param(m.lines, initialize={ln.name: ln.reactance for ln in self.lines}, within=Reals)       # Reatância da linha
+        m.line_from = Param(m.lines, initialize=dict(zip(arr.line_names, bus_names[arr.f])), within=Any)  # Barra de
+        m.line_to = Param(m.lines, initialize=dict(zip(arr.line_names, bus_names[arr.t])), within=Any)      # Barra para
+        m.line_x = Param(m.lines, initialize=dict(zip(arr.line_names, arr.x.tolist())), within=Reals)       # Reatância da linha
 
         if self.com_rede:
-            m.flow_max = Param(m.lines, initialize={ln.name: ln.flow_max_pu for ln in self.lines}, within=Reals)  # Fluxo máximo nas linhas
+            m.flow_max = Param(m.lines, initialize=dict(zip(arr.line_names, arr.flow_max.tolist())), within=Reals, mutable=True)  # Fluxo máximo nas linhas
 
         # Bus
-        m.bus_type = Param(m.buses, initialize={b.name: b.bus_type for b in self.buses}, within=Any)  # Tipo de barra
+        m.bus_type = Param(m.buses, initialize={b: bus_types[k] for b, k in zip(arr.bus_names, arr.bus_type.tolist())}, within=Any)  # Tipo de barra
+
+        # Incidências barra -> elementos, para que cada balanço percorra apenas os seus elementos
+        m.bus_generators = Set(m.buses, initialize=self._group_by_bus(arr.gen_names, arr.gen_bus), doc="Geradores de cada barra")
+        m.bus_loads = Set(m.buses, initialize=self._group_by_bus(arr.load_names, arr.load_bus), doc="Cargas de cada barra")
+        m.bus_lines_out = Set(m.buses, initialize=self._group_by_bus(arr.line_names, arr.f), doc="Linhas que saem de cada barra")
+        m.bus_lines_in = Set(m.buses, initialize=self._group_by_bus(arr.line_names, arr.t), doc="Linhas que entram em cada barra")
+
+    def _create_load_parameters(self):
+        m = self.model
+        arr = self.net.dc_arrays
+        m.load_p = Param(m.loads, initialize=dict(zip(arr.load_names, arr.load_p.tolist())), within=Reals, mutable=True)
+
+    def _group_by_bus(self, names, bus):
+        """
+        Agrupa os elementos (nomes) pela barra a que estão ligados, em tempo linear.
+        Retorna um dicionário {nome da barra: [nomes dos elementos]}.
+        """
+        arr = self.net.dc_arrays
+        order = np.argsort(bus, kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(bus, minlength=arr.nbus))))
+        names = [names[k] for k in order]
+        return {b: names[bounds[i]:bounds[i + 1]] for i, b in enumerate(arr.bus_names)}
 
     def _create_variables(self):
         m = self.model
@@ -80,28 +136,26 @@ class PNL_OPF:
                 return (theta_min, theta_max)
             m.theta = Var(m.buses, bounds=theta_bounds, doc=f"Bus angles ref to Slack")
             # Identifica barra slack
-            slack_bus = next((b for b in m.buses if m.bus_type[b] == "Slack"), None)
-            if slack_bus is None:
+            arr = self.net.dc_arrays
+            if len(arr.slack_idx) == 0:
                 raise ValueError("Nenhuma barra slack encontrada!")
-            m.theta[slack_bus].fix(0)
+            m.theta[arr.bus_names[arr.slack_idx[0]]].fix(0)
 
     def _create_constraints(self):
         m = self.model
 
         if self.com_rede == True: #Balanço por Barra
             def balance_with_net_rule(m, bus):
-                generation = sum(m.p[g] if m.generator_bus[g] == bus else 0 for g in m.generators)
-                load = sum(m.load_p[l] if m.load_bus[l] == bus else 0 for l in m.loads)
+                generation = quicksum(m.p[g] for g in m.bus_generators[bus])
+                load = sum(m.load_p[l] for l in m.bus_loads[bus])
                 
                 # Fluxos que saem da barra
-                flow_out = sum(
-                    (m.theta[bus] - m.theta[m.line_to[ln]]) / m.line_x[ln]
-                    if m.line_from[ln] == bus else 0 for ln in m.lines)
+                flow_out = quicksum(
+                    (m.theta[bus] - m.theta[m.line_to[ln]]) / m.line_x[ln] for ln in m.bus_lines_out[bus])
                 
                 # Fluxos que entram na barra
-                flow_in = sum(
-                    (m.theta[m.line_from[ln]] - m.theta[bus]) / m.line_x[ln]
-                    if m.line_to[ln] == bus else 0 for ln in m.lines)
+                flow_in = quicksum(
+                    (m.theta[m.line_from[ln]] - m.theta[bus]) / m.line_x[ln] for ln in m.bus_lines_in[bus])
 
                 return generation - flow_out + flow_in == load
             m.balance_with_net = Constraint(m.buses, rule=balance_with_net_rule, doc="Balance of Generation and Load with Network Rule")
@@ -114,13 +168,16 @@ class PNL_OPF:
 
         else: #com_rede == False, Balanço total
             def balance_without_net_rule(m):
-                generation = sum(m.p[g] for g in m.generators)
+                generation = quicksum(m.p[g] for g in m.generators)
                 load = sum(m.load_p[l] for l in m.loads)
                 return generation == load
             m.balance_without_net = Constraint(rule=balance_without_net_rule, doc="Total Balance of Generation and Load")
 
     def _create_objective(self):
         m = self.model
+        if self.segments is not None:
+            self._create_pwl_objective()
+            return
         if self.is_cubic == True:
             def objective_rule(m):
                 total_cost = 0
@@ -143,71 +200,333 @@ class PNL_OPF:
                 return total_cost
         m.obj = Objective(rule=objective_rule, sense=minimize)
 
+    def _cost(self, p, a, b, c):
+        """Custo exato (cúbico ou quadrático, conforme is_cubic) de cada gerador."""
+        if self.is_cubic:
+            return a * p + (b / 2) * p**2 + (c / 3) * p**3
+        return a + b * p + c * p**2
+
+    def _pwl_coefficients(self):
+        """
+        Interceptos e inclinações (n_generators, segments) das cordas do custo entre pontos igualmente
+        espaçados de [p_min, p_max]. Para custos convexos, o custo linearizado é o máximo das cordas.
+        """
+        m = self.model
+        a, b, c, p_min, p_max = (self._param_array(param) for param in (
+            m.generator_cost_a, m.generator_cost_b, m.generator_cost_c, m.generator_pmin, m.generator_pmax))
+        if not np.all(np.isfinite(p_max)):
+            raise ValueError("A linearização dos custos exige p_max finito em todos os geradores.")
+        x = p_min[:, None] + (p_max - p_min)[:, None] * np.linspace(0, 1, self.segments + 1)
+        f = self._cost(x, a[:, None], b[:, None], c[:, None])
+        dx = np.diff(x, axis=1)
+        slope = np.divide(np.diff(f, axis=1), dx, out=np.zeros_like(dx), where=dx > 0)
+        intercept = f[:, :-1] - slope * x[:, :-1]
+        return intercept, slope
+
+    def _create_pwl_objective(self):
+        """Formulação epígrafe do custo linearizado: cost[g] >= intercepto + inclinação * p[g] em cada segmento."""
+        m = self.model
+        m.segments = RangeSet(0, self.segments - 1, doc="Segmentos da linearização dos custos")
+        m.pwl_intercept = Param(m.generators, m.segments, initialize=0.0, within=Reals, mutable=True)
+        m.pwl_slope = Param(m.generators, m.segments, initialize=0.0, within=Reals, mutable=True)
+        self._update_pwl()
+
+        m.cost = Var(m.generators, within=Reals, doc="Custo linearizado de cada gerador")
+        def pwl_rule(m, g, k):
+            return m.cost[g] >= m.pwl_intercept[g, k] + m.pwl_slope[g, k] * m.p[g]
+        m.pwl_cost = Constraint(m.generators, m.segments, rule=pwl_rule, doc="Piecewise-linear cost segments")
+        m.obj = Objective(expr=quicksum(m.cost[g] for g in m.generators), sense=minimize)
+
+    def _update_pwl(self):
+        m = self.model
+        intercept, slope = self._pwl_coefficients()
+        names = list(m.generators)
+        m.pwl_intercept.store_values({(g, k): intercept[i, k] for i, g in enumerate(names) for k in m.segments})
+        m.pwl_slope.store_values({(g, k): slope[i, k] for i, g in enumerate(names) for k in m.segments})
+
+    def _create_suffixes(self):
+        """
+        Sufixos para trocar duais e multiplicadores de limites com o IPOPT, usados no warm start.
+        Os duais só são exportados durante um warm start do IPOPT (ver solve); os outros solvers não os leem.
+        """
+        m = self.model
+        m.dual = Suffix(direction=Suffix.IMPORT)
+        m.ipopt_zL_out = Suffix(direction=Suffix.IMPORT)
+        m.ipopt_zU_out = Suffix(direction=Suffix.IMPORT)
+        m.ipopt_zL_in = Suffix(direction=Suffix.EXPORT)
+        m.ipopt_zU_in = Suffix(direction=Suffix.EXPORT)
+
+    def update(self, load_p=None, p_max=None, p_min=None, cost_a=None, cost_b=None, cost_c=None, flow_max=None):
+        """
+        Updates the mutable parameters of the model in place, without rebuilding it.
+        Each argument is either a dict {name: value} or an array in the order of the network
+        elements (loads, generators or lines), in pu.
+        Args:
+            load_p: Active power of the loads.
+            p_max, p_min: Generation limits.
+            cost_a, cost_b, cost_c: Generation cost coefficients (already in pu, as Generator.cost_*).
+            flow_max: Flow limits of the lines (only with com_rede=True).
+        """
+        m = self.model
+        arr = self.net.dc_arrays
+        updates = [
+            (m.load_p, arr.load_names, load_p),
+            (m.generator_pmax, arr.gen_names, p_max),
+            (m.generator_pmin, arr.gen_names, p_min),
+            (m.generator_cost_a, arr.gen_names, cost_a),
+            (m.generator_cost_b, arr.gen_names, cost_b),
+            (m.generator_cost_c, arr.gen_names, cost_c),
+        ]
+        if flow_max is not None:
+            if not self.com_rede:
+                raise ValueError("flow_max só pode ser atualizado no modelo com rede (com_rede=True).")
+            updates.append((m.flow_max, arr.line_names, flow_max))
+
+        for param, names, values in updates:
+            if values is None:
+                continue
+            if not isinstance(values, dict):
+                values = np.asarray(values, dtype=float)
+                if values.shape != (len(names),):
+                    raise ValueError(f"Expected {len(names)} values for {param.name}, got shape {values.shape}.")
+                values = dict(zip(names, values.tolist()))
+            param.store_values(values)
+
+        if self.segments is not None:
+            self._update_pwl()
+
+    def _param_array(self, param) -> np.ndarray:
+        """Valores atuais de um parâmetro indexado, na ordem do seu conjunto."""
+        return np.array([value(param[k]) for k in param.index_set()], dtype=float)
+
+    def _bus_angles(self) -> np.ndarray:
+        """Ângulos das barras na solução atual (rad), na ordem de network.buses."""
+        m = self.model
+        return np.array([value(m.theta[b]) for b in m.buses])
+
+    def _lmps(self) -> np.ndarray:
+        """
+        Duais do balanço de cada barra (custo marginal da carga em cada barra, $/pu).
+        Sem rede, o dual do balanço total vale para todas as barras. NaN se o solver não retornar duais.
+        """
+        m = self.model
+        if self.com_rede:
+            return np.array([m.dual.get(m.balance_with_net[b], np.nan) for b in m.buses])
+        return np.full(len(m.buses), m.dual.get(m.balance_without_net, np.nan))
+
     def _create_results(self):
         """
         Método para extrair resultados após resolver o modelo.
         Pode ser chamado após a resolução para obter os resultados.
+        Os resultados numéricos ficam em self.result (OPFResults) e o DataFrame de uma linha em self.results.
         """
         m = self.model
+        arr = self.net.dc_arrays
+        p = np.array([m.p[g].value for g in m.generators])
+        a, b, c = (self._param_array(param) for param in (m.generator_cost_a, m.generator_cost_b, m.generator_cost_c))
+
         # Calcula o custo real com base nas variáveis resolvidas
-        total_cost_quad = 0
-        for g in m.generators:
-            total_cost_quad += (
-                m.generator_cost_a[g] +
-                (m.generator_cost_b[g]) * m.p[g].value +
-                (m.generator_cost_c[g]) * m.p[g].value**2
-            )
-
-        total_cost_cubic = 0
-        for g in m.generators:
-            total_cost_cubic += (
-                m.generator_cost_a[g] * m.p[g].value+
-                (m.generator_cost_b[g]/2) * m.p[g].value**2 +
-                (m.generator_cost_c[g]/3) * m.p[g].value**3
-            )            
-
-        # Cria um dicionário para os resultados
-        results_dict = {
-            'Objective Value': value(m.obj),
-            'Total Cost Quad': f'Total Cost Quad: $ {total_cost_quad}',
-            'Total Cost Cubic': f'Total Cost Cubic $ {total_cost_cubic}',
-            'Generators Power (pu)': {g: value(m.p[g]) for g in m.generators}
-        }
+        total_cost_quad = np.sum(a + b * p + c * p**2)
+        total_cost_cubic = np.sum(a * p + (b / 2) * p**2 + (c / 3) * p**3)
 
+        network = {}
         if self.com_rede:
-            results_dict['Bus Angles'] = {b: value(m.theta[b]) for b in m.buses}
+            theta = self._bus_angles()
             # Calcula o fluxo em cada linha
-            results_dict['Line Flows (pu)'] = {
-                ln: (value(m.theta[m.line_to[ln]]) - value(m.theta[m.line_from[ln]])) / m.line_x[ln]
-                for ln in m.lines
-            }
+            network = dict(theta=theta, line_names=arr.line_names, flows=(theta[arr.t] - theta[arr.f]) / arr.x)
+
+        self.result = OPFResults(
+            objective=value(m.obj),
+            cost_quad=total_cost_quad,
+            cost_cubic=total_cost_cubic,
+            gen_names=arr.gen_names,
+            generation=p,
+            bus_names=arr.bus_names,
+            lmp=self._lmps(),
+            approximation_error=None if self.segments is None else value(m.obj) - np.sum(self._cost(p, a, b, c)),
+            **network,
+        )
 
         # Exporta os resultados como DataFrame de uma linha
-        self.results = pd.DataFrame([results_dict])
+        self.results = self.result.to_frame()
 
         return self.results
 
 
-    def solve(self, solver_name='ipopt', tee=False):
+    def _cache_data(self) -> list:
+        """Valores atuais dos parâmetros mutáveis que definem o problema, para a chave do cache."""
+        m = self.model
+        params = [m.load_p, m.generator_pmax, m.generator_pmin, m.generator_cost_a, m.generator_cost_b, m.generator_cost_c]
+        if self.com_rede:
+            params.append(m.flow_max)
+        return [self._param_array(param) for param in params]
+
+    def _cache_keys(self, solver_name) -> tuple:
+        arr = self.net.dc_arrays
+        solver = self._solvers.get(solver_name)
+        options = sorted((k, str(v)) for k, v in solver.options.items() if not k.startswith(('warm_start', 'mu_init'))) if solver else []
+        structure = (type(self).__name__, self.com_rede, self.is_cubic, self.segments, solver_name, options, arr.digest(NetworkArrays.STRUCTURE))
+        return SolveCache.keys(structure, [arr.data_vector()] + self._cache_data())
+
+    def _variable_values(self) -> dict:
+        """Valores das variáveis do modelo, {nome do componente: vetor na ordem do índice}."""
+        return {var.name: np.array([np.nan if v.value is None else v.value for v in var.values()])
+                for var in self.model.component_objects(Var)}
+
+    def _set_variable_values(self, values: dict):
+        for var in self.model.component_objects(Var):
+            if var.name in values:
+                for v, x in zip(var.values(), values[var.name]):
+                    if not v.fixed and not np.isnan(x):
+                        v.set_value(x, skip_validation=True)
+
+    def _cache_lookup(self, cache, solver_name):
+        """
+        Looks the current problem up in the cache.
+        On a hit, loads the cached solution and results and returns (True, keys).
+        On a miss, starts from the closest cached solution (if the model has no solution of its own)
+        and returns (False, keys), to be passed to _cache_store after solving.
+        """
+        if cache is None:
+            return False, None
+        keys = self._cache_keys(solver_name)
+        entry = cache.get(keys[0])
+        if entry is not None:
+            self._set_variable_values(entry['values'])
+            self._solved = False # Os duais do modelo não correspondem à solução carregada
+            self.result = entry['result']
+            self.results = self.result.to_frame()
+            return True, keys
+        if not self._solved:
+            entry = cache.nearest(keys[1], keys[2])
+            if entry is not None:
+                self._set_variable_values(entry['values'])
+        return False, keys
+
+    def _cache_store(self, cache, keys):
+        if cache is not None:
+            cache.put(*keys, {'result': self.result, 'values': self._variable_values()})
+
+    def _model_size(self) -> tuple:
+        """
+        Number of variables, active constraints and constraint Jacobian nonzeros.
+        Recounted only when the number of variables or constraints changes.
+        """
+        m = self.model
+        constraints = list(m.component_data_objects(Constraint, active=True))
+        n_variables = sum(1 for v in m.component_data_objects(Var) if not v.fixed)
+        if self._size is None or self._size[:2] != (n_variables, len(constraints)):
+            n_nonzeros = sum(sum(1 for _ in identify_variables(c.body, include_fixed=False)) for c in constraints)
+            self._size = (n_variables, len(constraints), n_nonzeros)
+        return self._size
+
+    def _run_solver(self, solver, tee, phases: dict, **solve_options):
+        """
+        Runs the solver, timing the whole solver.solve call (phase 'solver'). Only public data is used.
+        When the results report the solver time (wallclock_time, time or user_time, depending on the
+        solver interface), the call is split into the solver run ('solver') and the Pyomo interface,
+        i.e. writing the problem and loading the solution back ('interface'). See also _split_solver_time.
+        """
+        start = time.perf_counter()
+        results = solver.solve(self.model, tee=tee, **solve_options)
+        phases['solver'] = time.perf_counter() - start
+        info = getattr(results, 'solver', None)
+        for name in ('wallclock_time', 'time', 'user_time'):
+            try:
+                reported = float(getattr(info, name))
+            except (AttributeError, TypeError, ValueError): # Campo ausente ou indefinido nesta interface
+                continue
+            self._split_solver_time(phases, reported)
+            break
+        return results
+
+    @staticmethod
+    def _split_solver_time(phases: dict, reported: float):
+        """Splits the timed solver call into the time reported by the solver and the rest ('interface')."""
+        total = phases['solver'] + phases.get('interface', 0.0)
+        if 0 <= reported <= total:
+            phases['solver'] = reported
+            phases['interface'] = total - reported
+
+    def _report(self, stats: SolveStats):
+        self.stats = stats
+        if isinstance(self.hook, logging.Logger):
+            self.hook.info("%s stats: %s", type(self).__name__, stats.as_dict())
+        elif self.hook is not None:
+            self.hook(stats)
+
+    def _cache_hit(self, phases: dict, start: float):
+        phases['cache'] = time.perf_counter() - start
+        stats = SolveStats(phases, *self._model_size())
+        self.result = replace(self.result, stats=stats)
+        self._report(stats)
+        return self.results
+
+    def solve(self, solver_name='ipopt', tee=False, warm_start=True, cache=None):
         """
         Solve the optimization problem using the specified solver.
+        The solver instance is kept between calls, so the model can be re-solved after update().
         Args:
             solver_name (str): The name of the solver to use.
             tee (bool): Whether to print solver output.
+            warm_start (bool): With IPOPT, start from the previous primal/dual solution when there is one.
+            cache (SolveCache, optional): Returns a cached solution of the same problem when there is one,
+                otherwise solves (starting from the closest cached solution) and stores the solution.
         Returns:
             SolverResults: The results of the optimization.
         """
-        solver = SolverFactory(solver_name)
-        results = solver.solve(self.model, tee=tee)
+        # O primeiro solve de um modelo também reporta o tempo de construção
+        phases, self._build_phases = self._build_phases, {}
+        start = time.perf_counter()
+        hit, keys = self._cache_lookup(cache, solver_name)
+        if hit:
+            return self._cache_hit(phases, start)
+
+        if solver_name not in self._solvers:
+            self._solvers[solver_name] = SolverFactory(solver_name)
+        solver = self._solvers[solver_name]
+
+        is_ipopt = 'ipopt' in solver_name
+        m = self.model
+        m.dual.direction = Suffix.IMPORT
+        if is_ipopt and warm_start and self._solved:
+            m.dual.direction = Suffix.IMPORT_EXPORT
+            m.ipopt_zL_in.update(m.ipopt_zL_out)
+            m.ipopt_zU_in.update(m.ipopt_zU_out)
+            solver.options['warm_start_init_point'] = 'yes'
+            solver.options['warm_start_bound_push'] = 1e-9
+            solver.options['warm_start_mult_bound_push'] = 1e-9
+            solver.options['mu_init'] = 1e-6
+        elif is_ipopt:
+            for option in ('warm_start_init_point', 'warm_start_bound_push', 'warm_start_mult_bound_push', 'mu_init'):
+                solver.options.pop(option, None)
+
+        if is_ipopt:
+            # O log do IPOPT é lido de um arquivo pedido pela opção pública logfile do solve
+            handle, logfile = tempfile.mkstemp(suffix='.log')
+            os.close(handle)
+            try:
+                results = self._run_solver(solver, tee, phases, logfile=logfile)
+                with open(logfile) as f:
+                    solver_stats = parse_ipopt_log(f.read())
+            finally:
+                os.remove(logfile)
+        else:
+            results = self._run_solver(solver, tee, phases)
+            solver_stats = {}
+        if 'solver_time' in solver_stats and 'interface' not in phases:
+            self._split_solver_time(phases, solver_stats['solver_time'])
         if results.solver.termination_condition != TerminationCondition.optimal:
+            self._solved = False
             raise ValueError(f"Solver did not find an optimal solution: {results.solver.termination_condition}")
-        self._create_results()
-        return self.results
-
-    
-
-    
+        self._solved = True
 
+        start = time.perf_counter()
+        self._create_results()
+        phases['create_results'] = time.perf_counter() - start
+        stats = SolveStats(phases, *self._model_size(), solver=solver_stats)
+        self.result = replace(self.result, stats=stats)
+        self._report(stats)
 
-        
-        
\ No newline at end of file
+        self._cache_store(cache, keys)
+        return self.results
@@ -0,0 +1,300 @@
+from pyomo.environ import *
+from power.models.electricity_models import *
+from power.models.OPF_models.OPF_PNL import PNL_OPF
+from power.models.OPF_models.OPF_results import OPFResults
+from power.models.OPF_models.OPF_stats import SolveStats
+from dataclasses import replace
+import numpy as np
+
+class PNL_OPF_MP(PNL_OPF):
+    """
+    Multi-period version of PNL_OPF over the load curves (Load.p_input_series),
+    with and without network, coupling consecutive periods by the generator ramp limits.
+    """
+    def __init__(self, network: Network, com_rede=True, is_cubic=True, load_series=None, p_initial=None, hook=None):
+        """
+        Args:
+            network (Network): The network.
+            com_rede (bool): Whether to include the DC network.
+            is_cubic (bool): Cubic (True) or quadratic (False) costs, as in PNL_OPF.
+            load_series (np.ndarray, optional): Load matrix (n_loads, T) in pu. Defaults to network.load_p_series().
+            p_initial (array, optional): Generation (pu) of the period before the horizon, to apply the ramp
+                limits to the first period. Used by the rolling horizon.
+            hook (callable or logging.Logger, optional): Receives the SolveStats of every solve, as in PNL_OPF.
+        """
+        self.load_series = np.asarray(network.load_p_series() if load_series is None else load_series, dtype=float)
+        if self.load_series.ndim != 2 or self.load_series.shape[0] != len(network.loads):
+            raise ValueError(f"load_series must have shape (n_loads, T) = ({len(network.loads)}, T), got {self.load_series.shape}.")
+        self.T = self.load_series.shape[1]
+        self._p_initial = p_initial
+        super().__init__(network, com_rede=com_rede, is_cubic=is_cubic, hook=hook)
+
+    def _create_sets(self):
+        super()._create_sets()
+        self.model.periods = RangeSet(0, self.T - 1, doc="Períodos do horizonte")
+
+    def _create_load_parameters(self):
+        m = self.model
+        arr = self.net.dc_arrays
+        m.load_p = Param(m.loads, m.periods, initialize=self._load_dict(self.load_series), within=Reals, mutable=True)
+
+        # Rampas (pu por período). Rampa nula ou negativa significa sem limite de rampa.
+        m.generator_ramp = Param(m.generators, initialize=dict(zip(arr.gen_names, arr.gen_ramp.tolist())), within=Reals)
+        initial = np.zeros(len(arr.gen_names)) if self._p_initial is None else np.asarray(self._p_initial, dtype=float)
+        m.p_initial = Param(m.generators, initialize=dict(zip(arr.gen_names, initial.tolist())), within=Reals, mutable=True)
+
+    def _load_dict(self, load_series) -> dict:
+        names = self.net.dc_arrays.load_names
+        return {(l, t): load_series[k, t] for k, l in enumerate(names) for t in range(load_series.shape[1])}
+
+    def _create_variables(self):
+        m = self.model
+
+        #Generators
+        def gen_bounds(m, g, t):
+            return (m.generator_pmin[g], m.generator_pmax[g])
+        m.p = Var(m.generators, m.periods, bounds=gen_bounds, doc="Active Power Generation (pu)")
+
+        #Buses
+        if self.com_rede == True:
+            m.theta = Var(m.buses, m.periods, bounds=(-np.pi/2, np.pi/2), doc=f"Bus angles ref to Slack")
+            # Identifica barra slack
+            arr = self.net.dc_arrays
+            if len(arr.slack_idx) == 0:
+                raise ValueError("Nenhuma barra slack encontrada!")
+            slack_bus = arr.bus_names[arr.slack_idx[0]]
+            for t in m.periods:
+                m.theta[slack_bus, t].fix(0)
+
+    def _create_constraints(self):
+        m = self.model
+
+        if self.com_rede == True: #Balanço por Barra e período
+            def balance_with_net_rule(m, bus, t):
+                generation = quicksum(m.p[g, t] for g in m.bus_generators[bus])
+                load = sum(m.load_p[l, t] for l in m.bus_loads[bus])
+                flow_out = quicksum(
+                    (m.theta[bus, t] - m.theta[m.line_to[ln], t]) / m.line_x[ln] for ln in m.bus_lines_out[bus])
+                flow_in = quicksum(
+                    (m.theta[m.line_from[ln], t] - m.theta[bus, t]) / m.line_x[ln] for ln in m.bus_lines_in[bus])
+                return generation - flow_out + flow_in == load
+            m.balance_with_net = Constraint(m.buses, m.periods, rule=balance_with_net_rule, doc="Balance of Generation and Load with Network Rule")
+
+            def flow_max_rule(m, ln, t):
+                flow = (m.theta[m.line_from[ln], t] - m.theta[m.line_to[ln], t]) / m.line_x[ln]
+                return (-m.flow_max[ln], flow, m.flow_max[ln])
+            m.flow_max_constraint = Constraint(m.lines, m.periods, rule=flow_max_rule, doc="Flow limits of each branch")
+
+        else: #com_rede == False, Balanço total por período
+            def balance_without_net_rule(m, t):
+                generation = quicksum(m.p[g, t] for g in m.generators)
+                load = sum(m.load_p[l, t] for l in m.loads)
+                return generation == load
+            m.balance_without_net = Constraint(m.periods, rule=balance_without_net_rule, doc="Total Balance of Generation and Load")
+
+        # Rampas entre períodos consecutivos
+        ramped = [g for g in m.generators if m.generator_ramp[g] > 0]
+        m.ramped_generators = Set(initialize=ramped, doc="Geradores com limite de rampa")
+
+        def ramp_rule(m, g, t):
+            if t == m.periods.first():
+                return Constraint.Skip
+            return (-m.generator_ramp[g], m.p[g, t] - m.p[g, t - 1], m.generator_ramp[g])
+        m.ramp_constraint = Constraint(m.ramped_generators, m.periods, rule=ramp_rule, doc="Ramp limits between periods")
+
+        def ramp_initial_rule(m, g):
+            return (-m.generator_ramp[g], m.p[g, m.periods.first()] - m.p_initial[g], m.generator_ramp[g])
+        m.ramp_initial_constraint = Constraint(m.ramped_generators, rule=ramp_initial_rule, doc="Ramp limits from the period before the horizon")
+        if self._p_initial is None:
+            m.ramp_initial_constraint.deactivate()
+
+    def _create_objective(self):
+        m = self.model
+        if self.is_cubic == True:
+            def objective_rule(m):
+                return quicksum(
+                    m.generator_cost_a[g] * m.p[g, t] +
+                    (m.generator_cost_b[g] / 2) * m.p[g, t]**2 +
+                    (m.generator_cost_c[g] / 3) * m.p[g, t]**3
+                    for g in m.generators for t in m.periods)
+        else:
+            def objective_rule(m):
+                return quicksum(
+                    m.generator_cost_a[g] +
+                    m.generator_cost_b[g] * m.p[g, t] +
+                    m.generator_cost_c[g] * m.p[g, t]**2
+                    for g in m.generators for t in m.periods)
+        m.obj = Objective(rule=objective_rule, sense=minimize)
+
+    def update(self, load_p=None, p_initial=None, **kwargs):
+        """
+        Updates the mutable parameters of the model in place (see PNL_OPF.update).
+        Args:
+            load_p (np.ndarray, optional): Load matrix (n_loads, T) in pu.
+            p_initial (array, optional): Generation of the period before the horizon (pu).
+                Activates the ramp limits of the first period.
+            kwargs: Generator and line parameters, as in PNL_OPF.update.
+        """
+        m = self.model
+        if load_p is not None:
+            load_p = np.asarray(load_p, dtype=float)
+            if load_p.shape != (len(self.loads), self.T):
+                raise ValueError(f"Expected load_p of shape ({len(self.loads)}, {self.T}), got {load_p.shape}.")
+            self.load_series = load_p
+            m.load_p.store_values(self._load_dict(load_p))
+        if p_initial is not None:
+            names = self.net.dc_arrays.gen_names
+            m.p_initial.store_values(dict(zip(names, np.asarray(p_initial, dtype=float).tolist())))
+            m.ramp_initial_constraint.activate()
+        super().update(**kwargs)
+
+    def _cache_data(self) -> list:
+        data = super()._cache_data()
+        if self.model.ramp_initial_constraint.active:
+            data.append(self._param_array(self.model.p_initial))
+        return data
+
+    def generation(self) -> np.ndarray:
+        """Generation of the current solution as a matrix (n_generators, T), in pu."""
+        m = self.model
+        return np.array([[value(m.p[g, t]) for t in m.periods] for g in m.generators])
+
+    def costs(self, p) -> tuple:
+        """
+        Quadratic and cubic total costs of a generation matrix (n_generators, T).
+        Returns:
+            total_cost_quad, total_cost_cubic (float)
+        """
+        m = self.model
+        a, b, c = (np.array([value(param[g]) for g in m.generators])[:, None]
+                   for param in (m.generator_cost_a, m.generator_cost_b, m.generator_cost_c))
+        total_cost_quad = float(np.sum(a + b * p + c * p**2))
+        total_cost_cubic = float(np.sum(a * p + (b / 2) * p**2 + (c / 3) * p**3))
+        return total_cost_quad, total_cost_cubic
+
+    def _lmps(self) -> np.ndarray:
+        """Duais do balanço de cada barra e período, (n_buses, T). NaN se o solver não retornar duais."""
+        m = self.model
+        if self.com_rede:
+            return np.array([[m.dual.get(m.balance_with_net[b, t], np.nan) for t in m.periods] for b in m.buses])
+        lam = [m.dual.get(m.balance_without_net[t], np.nan) for t in m.periods]
+        return np.tile(lam, (len(m.buses), 1))
+
+    def _create_results(self):
+        """
+        Extrai os resultados após resolver o modelo, no mesmo formato de PNL_OPF,
+        com uma lista de valores por período para cada elemento (eixo de períodos em self.result).
+        """
+        m = self.model
+        arr = self.net.dc_arrays
+        p = self.generation()
+        a, b, c = (self._param_array(param)[:, None] for param in (m.generator_cost_a, m.generator_cost_b, m.generator_cost_c))
+
+        network = {}
+        if self.com_rede:
+            theta = np.array([[value(m.theta[b, t]) for t in m.periods] for b in m.buses])
+            network = dict(theta=theta, line_names=arr.line_names, flows=(theta[arr.t] - theta[arr.f]) / arr.x[:, None])
+
+        self.result = OPFResults(
+            objective=value(m.obj),
+            cost_quad=np.sum(a + b * p + c * p**2, axis=0),
+            cost_cubic=np.sum(a * p + (b / 2) * p**2 + (c / 3) * p**3, axis=0),
+            gen_names=arr.gen_names,
+            generation=p,
+            bus_names=arr.bus_names,
+            lmp=self._lmps(),
+            **network,
+        )
+        self.results = self.result.to_frame()
+        return self.results
+
+    @classmethod
+    def solve_rolling(cls, network: Network, window: int, step=None, com_rede=True, is_cubic=True,
+                      load_series=None, solver_name='ipopt', tee=False, warm_start=True):
+        """
+        Solves a long horizon as a sequence of overlapping windows (rolling horizon).
+        One model of `window` periods is built and re-solved for every window, with the loads
+        updated in place, the ramp limits coupled to the last committed period and a warm start
+        from the previous window (primal solution, bound multipliers and duals shifted by `step` periods).
+        Args:
+            window (int): Number of periods of each optimization window.
+            step (int, optional): Number of periods committed per window. Defaults to window.
+        Returns:
+            OPFResults: Committed periods of every window, in the format of _create_results for the whole
+                horizon (per-period costs, stats summed over the windows). to_frame() gives the DataFrame view.
+        """
+        load_series = np.asarray(network.load_p_series() if load_series is None else load_series, dtype=float)
+        T = load_series.shape[1]
+        step = window if step is None else step
+        if not 0 < step <= window:
+            raise ValueError("step must be between 1 and window.")
+
+        models = {} # Um modelo por tamanho de janela (a última pode ser menor)
+        committed = [] # Resultados de cada janela restritos aos períodos efetivados
+        stats = []
+        p_initial = None
+        start = 0
+        while start < T:
+            length = min(window, T - start)
+            loads = load_series[:, start:start + length]
+            if length not in models:
+                models[length] = cls(network, com_rede=com_rede, is_cubic=is_cubic, load_series=loads, p_initial=p_initial)
+            else:
+                models[length].update(load_p=loads, p_initial=p_initial)
+                models[length]._shift_solution(step)
+            opf = models[length]
+            opf.solve(solver_name=solver_name, tee=tee, warm_start=warm_start)
+
+            # Períodos efetivados: `step` por janela, ou todos na última janela
+            n_commit = length if start + length >= T else step
+            result = opf.result
+            committed.append({name: getattr(result, name)[..., :n_commit]
+                              for name in ('cost_quad', 'cost_cubic', 'generation', 'lmp', 'theta', 'flows')
+                              if getattr(result, name) is not None})
+            stats.append(result.stats)
+            p_initial = result.generation[:, n_commit - 1]
+            start += n_commit
+
+        arrays = {name: np.concatenate([c[name] for c in committed], axis=-1) for name in committed[0]}
+        cost = arrays['cost_cubic'] if is_cubic else arrays['cost_quad']
+        return replace(result, objective=float(np.sum(cost)), stats=SolveStats.combine(stats), **arrays)
+
+    def _shift_solution(self, step):
+        """
+        Shifts the current solution `step` periods back, as the initial point of the next window: the primal
+        values, the IPOPT bound multipliers of the variables and the duals of the constraints of each period.
+        The last `step` periods keep their values.
+        """
+        m = self.model
+        periods = set(list(m.periods)[:-step] if step < self.T else [])
+
+        def shift(component, suffixes, primal=False):
+            # Os índices terminam no período; percorridos em ordem crescente, t + step é lido antes de ser sobrescrito
+            for index in component:
+                key = index if isinstance(index, tuple) else (index,)
+                if key[-1] not in periods:
+                    continue
+                target = component[index]
+                source = component[key[:-1] + (key[-1] + step,)]
+                if primal and not target.fixed:
+                    target.set_value(value(source), skip_validation=True)
+                for suffix in suffixes:
+                    shifted = suffix.get(source)
+                    if shifted is None:
+                        suffix.clear_value(target)
+                    else:
+                        suffix.set_value(target, shifted)
+
+        variables = [m.p] + ([m.theta] if self.com_rede else [])
+        constraints = [m.ramp_constraint] + ([m.balance_with_net, m.flow_max_constraint] if self.com_rede else [m.balance_without_net])
+        for var in variables:
+            shift(var, (m.ipopt_zL_out, m.ipopt_zU_out), primal=True)
+        for constraint in constraints:
+            shift(constraint, (m.dual,))
+
+        # A rampa do primeiro período da nova janela é a de t = step da janela anterior
+        if step < self.T:
+            for g in m.ramped_generators:
+                dual = m.dual.get(m.ramp_constraint[g, step])
+                if dual is not None:
+                    m.dual.set_value(m.ramp_initial_constraint[g], dual)
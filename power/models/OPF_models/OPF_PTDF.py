@@ -0,0 +1,158 @@
+from pyomo.environ import *
+from power.models.electricity_models import *
+from power.models.OPF_models.OPF_PNL import PNL_OPF
+from power.models.OPF_models.OPF_stats import SolveStats
+from dataclasses import replace
+import time
+import numpy as np
+
+class PTDF_OPF(PNL_OPF):
+    """
+    DC-OPF in the PTDF formulation, with lazy line limits.
+    There are no bus angle variables: the model has a single system balance and the line flows are
+    PTDF expressions of the generation. It starts without flow limits; each solve() re-solves the model,
+    adding only the limits of the overloaded lines, until no line is overloaded.
+    The results have the same format as PNL_OPF with com_rede=True.
+    """
+    def __init__(self, network: Network, is_cubic=True, tol=1e-6, max_rounds=50, segments=None, hook=None):
+        """
+        Args:
+            network (Network): The network.
+            is_cubic (bool): Cubic (True) or quadratic (False) costs, as in PNL_OPF.
+            tol (float): Flow violation (pu) above which a line limit is added.
+            max_rounds (int): Maximum number of re-solves per call to solve().
+            segments (int, optional): Piecewise-linear costs, as in PNL_OPF.
+            hook (callable or logging.Logger, optional): Receives the SolveStats of every round, as in PNL_OPF.
+        """
+        self.tol = tol
+        self.max_rounds = max_rounds
+        self._ptdf_rows = {} # PTDF row (todas as barras) de cada linha monitorada
+        self.rounds = []
+        self.round_stats = []
+        super().__init__(network, com_rede=True, is_cubic=is_cubic, segments=segments, hook=hook)
+
+    def _create_variables(self):
+        m = self.model
+
+        #Generators
+        def gen_bounds(m, g):
+            return (m.generator_pmin[g], m.generator_pmax[g])
+        m.p = Var(m.generators, bounds=gen_bounds, doc="Active Power Generation (pu)")
+
+    def _create_constraints(self):
+        m = self.model
+
+        # Balanço total: com ele, a soma das injeções é nula e o PTDF independe da barra de referência
+        def balance_rule(m):
+            generation = quicksum(m.p[g] for g in m.generators)
+            load = sum(m.load_p[l] for l in m.loads)
+            return generation == load
+        m.balance_without_net = Constraint(rule=balance_rule, doc="Total Balance of Generation and Load")
+
+        # Limites de fluxo, adicionados apenas para as linhas violadas (ver _add_flow_limits)
+        m.flow_load = Param(m.lines, initialize=0.0, within=Reals, mutable=True, doc="Parcela do fluxo devida às cargas")
+        m.flow_max_constraint = Constraint(m.lines, rule=lambda m, ln: Constraint.Skip, doc="Flow limits of the monitored branches")
+
+    def _generation(self) -> np.ndarray:
+        m = self.model
+        return np.array([value(m.p[g]) for g in m.generators])
+
+    def _bus_loads(self) -> np.ndarray:
+        m = self.model
+        arr = self.net.dc_arrays
+        load_p = np.array([value(m.load_p[l]) for l in m.loads])
+        return np.bincount(arr.load_bus, load_p, arr.nbus)
+
+    def _dc_solution(self):
+        """
+        Bus angles (rad) and line flows (pu, from -> to) of the current generation, from one solve
+        with the cached factorization of the DC B matrix.
+        """
+        arr = self.net.dc_arrays
+        P = np.bincount(arr.gen_bus, self._generation(), arr.nbus) - self._bus_loads()
+        keep, lu = self.net.dc_factor()
+        theta = np.zeros(arr.nbus)
+        theta[keep] = lu.solve(P[keep])
+        return theta, self.net.dc_Bf() @ theta
+
+    def _bus_angles(self) -> np.ndarray:
+        theta, _ = self._dc_solution()
+        return theta
+
+    def _lmps(self) -> np.ndarray:
+        """
+        LMPs from the duals: the system lambda plus the congestion part of the monitored lines,
+        sum over lines of dual * PTDF row (a load at the bus relieves the flows with positive PTDF).
+        NaN if the solver does not return duals.
+        """
+        m = self.model
+        lmp = np.full(self.net.dc_arrays.nbus, m.dual.get(m.balance_without_net, np.nan))
+        for ln, row in self._ptdf_rows.items():
+            lmp += m.dual.get(m.flow_max_constraint[ln], np.nan) * row
+        return lmp
+
+    def _refresh_flow_loads(self):
+        """Updates the load part of the monitored flows, after changes of load_p."""
+        if not self._ptdf_rows:
+            return
+        P_load = self._bus_loads()
+        self.model.flow_load.store_values({ln: float(row @ P_load) for ln, row in self._ptdf_rows.items()})
+
+    def _add_flow_limits(self, lines):
+        """Adds the flow limit constraints of the given lines (indices), with their PTDF rows."""
+        m = self.model
+        arr = self.net.dc_arrays
+        rows = self.net.PTDF(lines=lines)
+        P_load = self._bus_loads()
+        for ln, row in zip((arr.line_names[k] for k in lines), rows):
+            self._ptdf_rows[ln] = row
+            m.flow_load[ln] = float(row @ P_load)
+            flow = quicksum(row[b] * m.p[g] for g, b in zip(arr.gen_names, arr.gen_bus) if row[b] != 0) - m.flow_load[ln]
+            m.flow_max_constraint[ln] = (-m.flow_max[ln], flow, m.flow_max[ln])
+
+    def monitored_lines(self) -> list:
+        """Names of the lines whose flow limits are in the model."""
+        return list(self._ptdf_rows)
+
+    def solve(self, solver_name='ipopt', tee=False, warm_start=True, cache=None):
+        """
+        Solves the model, adding the limits of the overloaded lines and re-solving until no line is overloaded.
+        The limits added in previous calls are kept. The number of lines added in each round is stored in self.rounds,
+        the stats of each round in self.round_stats and their sum (with the screening time) in self.stats.
+        Args:
+            solver_name (str): The name of the solver to use.
+            tee (bool): Whether to print solver output.
+            warm_start (bool): With IPOPT, start each re-solve from the previous primal/dual solution.
+            cache (SolveCache, optional): Cache of solutions, as in PNL_OPF.solve.
+        Returns:
+            results (pd.DataFrame): One-row DataFrame in the format of PNL_OPF._create_results.
+        """
+        start = time.perf_counter()
+        hit, keys = self._cache_lookup(cache, solver_name)
+        if hit:
+            phases, self._build_phases = self._build_phases, {}
+            return self._cache_hit(phases, start)
+
+        m = self.model
+        arr = self.net.dc_arrays
+        self._refresh_flow_loads()
+        self.rounds = []
+        self.round_stats = []
+        for _ in range(self.max_rounds):
+            super().solve(solver_name=solver_name, tee=tee, warm_start=warm_start)
+            start = time.perf_counter()
+            _, flows = self._dc_solution()
+            flow_max = np.array([value(m.flow_max[ln]) for ln in m.lines])
+            monitored = np.isin(arr.line_names, self.monitored_lines())
+            violated = np.flatnonzero((np.abs(flows) > flow_max + self.tol) & ~monitored)
+            self.rounds.append(len(violated))
+            if len(violated):
+                self._add_flow_limits(violated)
+            self.stats.phases['screen'] = time.perf_counter() - start
+            self.round_stats.append(self.stats)
+            if len(violated) == 0:
+                self.stats = SolveStats.combine(self.round_stats)
+                self.result = replace(self.result, stats=self.stats)
+                self._cache_store(cache, keys)
+                return self.results
+        raise ValueError(f"Line limits still violated after {self.max_rounds} rounds.")
@@ -0,0 +1,147 @@
+from pyomo.environ import *
+from power.models.electricity_models import *
+from power.models.contingency_models import ContingencyAnalysis
+from power.models.OPF_models.OPF_PNL import PNL_OPF
+from power.models.OPF_models.OPF_stats import SolveStats
+from dataclasses import replace
+import time
+import numpy as np
+
+class SC_OPF(PNL_OPF):
+    """
+    Preventive security-constrained DC-OPF (N-1) on the angle formulation of PNL_OPF.
+    The post-contingency flow of line l after the outage of line k is the LODF expression
+    f_l + LODF[l, k] f_k of the base-case flows, so no copy of the angles or balances is made per
+    contingency. Each solve() screens the branch outages of the dispatch (ContingencyAnalysis), adds the
+    limits of the violated contingency/line pairs only and re-solves, with a warm start, until it is secure.
+    The results have the same format as PNL_OPF with com_rede=True.
+    """
+    def __init__(self, network: Network, is_cubic=True, outages=None, rating=1.0, tol=1e-6, max_rounds=50,
+                 segments=None, hook=None):
+        """
+        Args:
+            network (Network): The network.
+            is_cubic (bool): Cubic (True) or quadratic (False) costs, as in PNL_OPF.
+            outages (list, optional): Contingencies, as outaged lines (Line objects or indices). All lines if None.
+                Outages that split the network cannot be secured and are only reported (self.islanding).
+            rating (float): Post-contingency limit as a multiple of flow_max (e.g. 1.2 for emergency ratings).
+            tol (float): Flow violation (pu) above which a post-contingency limit is added.
+            max_rounds (int): Maximum number of re-solves per call to solve().
+            segments (int, optional): Piecewise-linear costs, as in PNL_OPF.
+            hook (callable or logging.Logger, optional): Receives the SolveStats of every round, as in PNL_OPF.
+        """
+        self.outages = Network._selection(outages, network.line_idx, len(network.lines))
+        self.rating = rating
+        self.tol = tol
+        self.max_rounds = max_rounds
+        self.rounds = []
+        self.round_stats = []
+        self.islanding = []
+        self.screening = None
+        super().__init__(network, com_rede=True, is_cubic=is_cubic, segments=segments, hook=hook)
+
+    def _create_constraints(self):
+        super()._create_constraints()
+        m = self.model
+
+        # Limites pós-contingência, adicionados apenas para os pares (contingência, linha) violados
+        m.security_rating = Param(initialize=self.rating, within=Reals, mutable=True, doc="Limite pós-contingência / flow_max")
+        m.security_pairs = Set(dimen=2, initialize=[], ordered=True, doc="Pares (linha desligada, linha monitorada)")
+        m.security_constraint = Constraint(m.security_pairs, doc="Post-contingency flow limits")
+
+    def _flow(self, ln):
+        m = self.model
+        return (m.theta[m.line_from[ln]] - m.theta[m.line_to[ln]]) / m.line_x[ln]
+
+    def _add_security_limits(self, outages, lines):
+        """Adds the post-contingency limits of the pairs (outages[i], lines[i]) (line indices)."""
+        m = self.model
+        arr = self.net.dc_arrays
+        outaged, pos = np.unique(outages, return_inverse=True)
+        lodf = self.net.LODF(outages=outaged)
+        for k, l, coefficient in zip(outages, lines, lodf[lines, pos]):
+            kn, ln = arr.line_names[k], arr.line_names[l]
+            m.security_pairs.add((kn, ln))
+            flow = self._flow(ln) + float(coefficient) * self._flow(kn)
+            limit = m.security_rating * m.flow_max[ln]
+            m.security_constraint[kn, ln] = (-limit, flow, limit)
+
+    def security_pairs(self) -> list:
+        """Pairs (outaged line, monitored line) whose post-contingency limits are in the model."""
+        return list(self.model.security_pairs)
+
+    def update(self, rating=None, **params):
+        """
+        Updates the mutable parameters of the model in place (see PNL_OPF.update).
+        Args:
+            rating (float, optional): New post-contingency limit as a multiple of flow_max.
+        """
+        super().update(**params)
+        if rating is not None:
+            self.rating = rating
+            self.model.security_rating.set_value(rating)
+
+    def _cache_data(self) -> list:
+        return super()._cache_data() + [np.array([self.rating]), self.outages.astype(float)]
+
+    def screen(self):
+        """
+        N-1 screening of the current dispatch against rating * flow_max.
+        Returns:
+            ContingencyResults: The ranked contingencies (also kept in self.screening).
+        """
+        arr = self.net.dc_arrays
+        theta = self._bus_angles()
+        flows = (theta[arr.f] - theta[arr.t]) / arr.x
+        limits = self.rating * self._param_array(self.model.flow_max)
+        self.screening = ContingencyAnalysis(self.net, flows=flows, flow_max=limits).screen(1, outages=self.outages)
+        return self.screening
+
+    def solve(self, solver_name='ipopt', tee=False, warm_start=True, cache=None):
+        """
+        Solves the model, adding the post-contingency limits of the violated contingency/line pairs and
+        re-solving until no contingency overloads a line. The limits added in previous calls are kept.
+        The number of limits added in each round is stored in self.rounds, the stats of each round
+        (with its screening time) in self.round_stats and their sum in self.stats.
+        Args:
+            solver_name (str): The name of the solver to use.
+            tee (bool): Whether to print solver output.
+            warm_start (bool): With IPOPT, start each re-solve from the previous primal/dual solution.
+            cache (SolveCache, optional): Cache of solutions, as in PNL_OPF.solve.
+        Returns:
+            results (pd.DataFrame): One-row DataFrame in the format of PNL_OPF._create_results.
+        """
+        start = time.perf_counter()
+        hit, keys = self._cache_lookup(cache, solver_name)
+        if hit:
+            phases, self._build_phases = self._build_phases, {}
+            return self._cache_hit(phases, start)
+
+        arr = self.net.dc_arrays
+        self.rounds = []
+        self.round_stats = []
+        for _ in range(self.max_rounds):
+            super().solve(solver_name=solver_name, tee=tee, warm_start=warm_start)
+            start = time.perf_counter()
+            screening = self.screen()
+            self.islanding = [arr.line_names[k] for k in screening.outages[screening.islanding, 0]]
+
+            outages = screening.outages[screening.overload_case, 0]
+            lines = screening.overload_line
+            limits = self.rating * self._param_array(self.model.flow_max)
+            existing = set(self.model.security_pairs)
+            violated = (np.abs(screening.overload_flow) > limits[lines] + self.tol) & np.array(
+                [(arr.line_names[k], arr.line_names[l]) not in existing for k, l in zip(outages, lines)], dtype=bool)
+            self.rounds.append(int(violated.sum()))
+            if violated.any():
+                self._add_security_limits(outages[violated], lines[violated])
+            self.stats.phases['screen'] = time.perf_counter() - start
+            self.stats.solver['security_constraints'] = len(self.model.security_pairs)
+            self.round_stats.append(self.stats)
+            if not violated.any():
+                self.stats = SolveStats.combine(self.round_stats)
+                self.stats.solver['security_constraints'] = len(self.model.security_pairs)
+                self.result = replace(self.result, stats=self.stats)
+                self._cache_store(cache, keys)
+                return self.results
+        raise ValueError(f"Post-contingency limits still violated after {self.max_rounds} rounds.")
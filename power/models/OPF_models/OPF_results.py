@@ -0,0 +1,155 @@
+import glob
+import os
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import List, Optional
+from power.models.OPF_models.OPF_stats import SolveStats
+from power.models.utils import FrozenArrays
+
+@dataclass(frozen=True)
+class OPFResults(FrozenArrays):
+    """
+    Numeric results of an OPF solve, as NumPy arrays in the order of the network elements.
+    Arrays of multi-period models have a last axis of periods. Quantities that the
+    model does not have (e.g. angles without network) are None.
+    """
+    objective: float
+    cost_quad: np.ndarray # Custo quadrático total (por período nos modelos multi-período)
+    cost_cubic: np.ndarray # Custo cúbico total
+    gen_names: List[str]
+    generation: np.ndarray # Geração (pu)
+    bus_names: List[str]
+    lmp: Optional[np.ndarray] = None # Duais do balanço de cada barra ($/pu), NaN se o solver não os retornar
+    theta: Optional[np.ndarray] = None # Ângulos das barras (rad)
+    line_names: Optional[List[str]] = None
+    flows: Optional[np.ndarray] = None # Fluxos (pu), (theta_to - theta_from) / x, como em 'Line Flows (pu)'
+    approximation_error: Optional[float] = None # Custo linearizado - custo exato, no modo linearizado (segments)
+    stats: Optional[SolveStats] = field(default=None, compare=False) # Tempos por fase e tamanho do modelo
+
+    # Campos numéricos gravados por ResultsWriter (os nomes são gravados uma vez por arquivo)
+    NUMERIC = ('objective', 'cost_quad', 'cost_cubic', 'generation', 'lmp', 'theta', 'flows', 'approximation_error')
+    NAMES = ('gen_names', 'bus_names', 'line_names')
+
+    def columns(self) -> dict:
+        """Numeric fields of the result, {field: array}, without the None ones."""
+        return {name: np.asarray(getattr(self, name)) for name in self.NUMERIC if getattr(self, name) is not None}
+
+    def to_frame(self) -> pd.DataFrame:
+        """One-row DataFrame in the format of PNL_OPF._create_results (used by the json exports)."""
+        total_cost_quad = float(np.sum(self.cost_quad))
+        total_cost_cubic = float(np.sum(self.cost_cubic))
+        results_dict = {
+            'Objective Value': self.objective,
+            'Total Cost Quad': f'Total Cost Quad: $ {total_cost_quad}',
+            'Total Cost Cubic': f'Total Cost Cubic $ {total_cost_cubic}',
+            'Generators Power (pu)': dict(zip(self.gen_names, self.generation.tolist())),
+        }
+        if self.theta is not None:
+            results_dict['Bus Angles'] = dict(zip(self.bus_names, self.theta.tolist()))
+            results_dict['Line Flows (pu)'] = dict(zip(self.line_names, self.flows.tolist()))
+        if self.approximation_error is not None:
+            results_dict['PWL Approximation Error'] = self.approximation_error
+        return pd.DataFrame([results_dict])
+
+    def to_npz(self, path: str, compressed: bool = False):
+        """Saves the result to an .npz file (numeric fields and element names)."""
+        arrays = self.columns()
+        for name in self.NAMES:
+            if getattr(self, name) is not None:
+                arrays[name] = np.array(getattr(self, name))
+        (np.savez_compressed if compressed else np.savez)(path, **arrays)
+
+
+class ResultsWriter:
+    """
+    Append-only columnar store of many OPF results.
+    Results are buffered and written in row groups, one part-NNNNN.npz file per group, where each
+    numeric field is stacked along a first axis of runs (extra scalar tags, e.g. a scenario id,
+    become columns too). Existing parts are never rewritten, so a batch can be resumed or read while
+    it runs. Use read_results to load the whole store.
+    """
+    def __init__(self, path: str, chunk_size: int = 256, compressed: bool = False):
+        """
+        Args:
+            path (str): Directory of the store (created if needed).
+            chunk_size (int): Number of results per part file.
+            compressed (bool): Whether to compress the part files.
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.compressed = compressed
+        os.makedirs(path, exist_ok=True)
+        self._part = len(self._parts(path))
+        self._buffer = []
+        self._names = None
+
+    @staticmethod
+    def _parts(path: str) -> list:
+        return sorted(glob.glob(os.path.join(path, 'part-*.npz')))
+
+    def append(self, result: OPFResults, **tags):
+        """Adds a result (and optional scalar tags) to the store."""
+        names = {name: getattr(result, name) for name in OPFResults.NAMES if getattr(result, name) is not None}
+        self.append_columns(result.columns(), names, **tags)
+
+    def append_columns(self, columns: dict, names: Optional[dict] = None, **tags):
+        """
+        Adds a record of arbitrary numeric columns (e.g. power flow results) to the store.
+        Args:
+            columns (dict): {column: array}. Every record of a store must have the same columns.
+            names (dict, optional): Element names, {name: list}, written once per part file.
+            tags: Extra scalar columns.
+        """
+        if self._names is None:
+            self._names = dict(names or {})
+        record = {k: np.asarray(v) for k, v in columns.items()}
+        record.update({k: np.asarray(v) for k, v in tags.items()})
+        self._buffer.append(record)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered results to a new part file."""
+        if not self._buffer:
+            return
+        keys = self._buffer[0].keys()
+        if any(record.keys() != keys for record in self._buffer):
+            raise ValueError("All results of a store must have the same fields.")
+        arrays = {k: np.stack([record[k] for record in self._buffer]) for k in keys}
+        arrays.update({name: np.array(names) for name, names in self._names.items()})
+
+        # Grava em arquivo temporário e renomeia, para que leitores nunca vejam uma parte incompleta
+        target = os.path.join(self.path, f'part-{self._part:05d}.npz')
+        tmp = os.path.join(self.path, f'.tmp-{self._part:05d}.npz')
+        (np.savez_compressed if self.compressed else np.savez)(tmp, **arrays)
+        os.replace(tmp, target)
+        self._part += 1
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_results(path: str) -> dict:
+    """
+    Loads a store written by ResultsWriter.
+    Returns:
+        dict: {column: array}, numeric columns concatenated along the runs axis, plus the element names.
+    """
+    parts = ResultsWriter._parts(path)
+    if not parts:
+        raise FileNotFoundError(f"No results found in {path}.")
+    columns = {}
+    for part in parts:
+        with np.load(part) as data:
+            for key in data.files:
+                columns.setdefault(key, []).append(data[key])
+    return {key: values[0].tolist() if values[0].dtype.kind in 'US' else np.concatenate(values)
+            for key, values in columns.items()}
@@ -0,0 +1,79 @@
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+_IPOPT_PATTERNS = {
+    'iterations': re.compile(r'Number of Iterations\.*:\s*(\d+)'),
+    'ipopt_time': re.compile(r'Total seconds in IPOPT\s*=\s*([-+.\deE]+)'), # IPOPT >= 3.14
+    'ipopt_cpu_time': re.compile(r'Total CPU secs in IPOPT \(w/o function evaluations\)\s*=\s*([-+.\deE]+)'),
+    'function_cpu_time': re.compile(r'Total CPU secs in NLP function evaluations\s*=\s*([-+.\deE]+)'),
+    'exit': re.compile(r'EXIT:\s*(.+)'),
+}
+
+
+def parse_ipopt_log(log: str) -> dict:
+    """
+    Extracts the iteration count, the IPOPT time (s) and the exit message from an IPOPT log.
+    Older IPOPT versions report CPU times split in IPOPT and function evaluations, which are summed.
+    Fields missing from the log are left out.
+    """
+    found = {name: pattern.search(log) for name, pattern in _IPOPT_PATTERNS.items()}
+    stats = {}
+    if found['iterations']:
+        stats['iterations'] = int(found['iterations'].group(1))
+    if found['ipopt_time']:
+        stats['solver_time'] = float(found['ipopt_time'].group(1))
+    elif found['ipopt_cpu_time']:
+        stats['solver_time'] = float(found['ipopt_cpu_time'].group(1)) + (
+            float(found['function_cpu_time'].group(1)) if found['function_cpu_time'] else 0.0)
+    if found['exit']:
+        stats['exit'] = found['exit'].group(1).strip()
+    return stats
+
+
+@dataclass
+class SolveStats:
+    """
+    Instrumentation of an OPF solve: wall time (s) of each phase, model size and solver statistics.
+    Build phases (create_*) describe the construction of the model; the others the solve itself:
+    solver (solver run), interface (Pyomo writes the problem and loads the solution back) and
+    create_results. When the solver does not report its own time, solver is the whole call and there is no
+    interface phase.
+    """
+    phases: dict = field(default_factory=dict)
+    n_variables: int = 0
+    n_constraints: int = 0
+    n_nonzeros: int = 0 # Nonzeros of the constraint Jacobian
+    solver: dict = field(default_factory=dict) # e.g. iterations, solver_time, exit (IPOPT)
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.phases.values())
+
+    def as_dict(self) -> dict:
+        """Flat dictionary, e.g. for loggers or as ResultsWriter tags (time_* in seconds)."""
+        flat = {f'time_{name}': t for name, t in self.phases.items()}
+        flat.update(n_variables=self.n_variables, n_constraints=self.n_constraints, n_nonzeros=self.n_nonzeros)
+        flat.update({f'solver_{name}': v for name, v in self.solver.items()})
+        return flat
+
+    @classmethod
+    def combine(cls, stats: list) -> Optional["SolveStats"]:
+        """
+        Sums the phase times, iterations and solver times of several solves of the same model
+        (e.g. the rounds of PTDF_OPF). The model size is the one of the last solve.
+        """
+        if not stats:
+            return None
+        phases, solver = {}, {'rounds': len(stats)}
+        for s in stats:
+            for name, t in s.phases.items():
+                phases[name] = phases.get(name, 0.0) + t
+            for name in ('iterations', 'solver_time'):
+                if name in s.solver:
+                    solver[name] = solver.get(name, 0) + s.solver[name]
+        last = stats[-1]
+        if 'exit' in last.solver:
+            solver['exit'] = last.solver['exit']
+        return cls(phases=phases, n_variables=last.n_variables, n_constraints=last.n_constraints,
+                   n_nonzeros=last.n_nonzeros, solver=solver)
@@ -1,3 +1,8 @@
 from .OPF_PNL import PNL_OPF
+from .OPF_PNL_MP import PNL_OPF_MP
+from .OPF_PTDF import PTDF_OPF
+from .OPF_SC import SC_OPF
+from .OPF_results import OPFResults, ResultsWriter, read_results
+from .OPF_stats import SolveStats
 
-__all__ = ["PNL_OPF"]
\ No newline at end of file
+__all__ = ["PNL_OPF", "PNL_OPF_MP", "PTDF_OPF", "SC_OPF", "OPFResults", "ResultsWriter", "read_results", "SolveStats"]
@@ -1,11 +1,39 @@
-from .import electricity_models, power_flow_models, OPF_models
+import importlib
+
+from .import electricity_models, power_flow_models, contingency_models, solve_cache
+
+# Submódulos pesados (Pyomo, pandas): importados apenas no primeiro acesso a um de seus nomes
+_LAZY = {
+    'OPF_models': ["PNL_OPF", "PNL_OPF_MP", "PTDF_OPF", "SC_OPF", "OPFResults", "ResultsWriter", "read_results", "SolveStats"],
+    'dispatch_models': ["SimpleDispatch"],
+}
+_LAZY_NAMES = {name: module for module, names in _LAZY.items() for name in names}
 
 __all__ = []
 
 __all__ += electricity_models.__all__
 __all__ += power_flow_models.__all__
-__all__ += OPF_models.__all__
+__all__ += contingency_models.__all__
+__all__ += _LAZY['OPF_models']
+__all__ += _LAZY['dispatch_models']
+__all__ += ["SolveCache"]
 
 from .electricity_models import *
 from .power_flow_models import *
-from .OPF_models import *
+from .contingency_models import *
+from .solve_cache import SolveCache
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = importlib.import_module(f'.{name}', __name__)
+    elif name in _LAZY_NAMES:
+        value = getattr(importlib.import_module(f'.{_LAZY_NAMES[name]}', __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | set(_LAZY))
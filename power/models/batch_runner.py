@@ -0,0 +1,264 @@
+"""
+Parallel scenario runner: solves a grid of formulations over many load scenarios in a process pool
+and streams the results to disk (one ResultsWriter store per formulation).
+
+Console use:
+    python -m power.models.batch_runner systems.three_bus --out results --workers 8 \\
+        --com-rede true false --is-cubic true false --scale 0.8 1.2 1000
+"""
+import argparse
+import importlib
+import itertools
+import json
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Optional
+from power.models.OPF_models import PNL_OPF, PTDF_OPF, ResultsWriter
+from power.models.dispatch_models import SimpleDispatch
+from power.models.power_flow_models import AC_PF, DC_PF
+from power.models.utils import default_workers
+
+MODELS = ('PNL_OPF', 'PTDF_OPF', 'SimpleDispatch', 'AC_PF', 'DC_PF')
+
+# Estado de cada processo de trabalho: rede, cenários e modelos construídos uma única vez
+_WORKER = {}
+
+
+def formulation_grid(models=('PNL_OPF',), **options) -> list:
+    """
+    Cartesian product of model names and options, e.g.
+    formulation_grid(com_rede=[True, False], is_cubic=[True, False], solver=['ipopt']).
+    Returns:
+        list of dict: One formulation per combination, {'model': name, **options}.
+    """
+    keys = list(options)
+    grid = []
+    for model in models:
+        if model not in MODELS:
+            raise ValueError(f"Unknown model '{model}'. Use one of {MODELS}.")
+        for values in itertools.product(*(options[k] for k in keys)):
+            grid.append({'model': model, **dict(zip(keys, values))})
+    return grid
+
+
+def scale_scenarios(network, factors) -> np.ndarray:
+    """Load scenarios (n_scenarios, n_loads) in pu, scaling every load of the network by each factor."""
+    return np.outer(np.asarray(factors, dtype=float), network.arrays.load_p)
+
+
+def _init_worker(network_factory: Callable, scenarios: np.ndarray, formulations: list):
+    _WORKER.clear()
+    _WORKER.update(network=network_factory(), scenarios=scenarios, formulations=formulations, models={})
+
+
+def _build(spec: dict):
+    """Builds the model of a formulation on the worker network (once per worker)."""
+    network = _WORKER['network']
+    options = {k: v for k, v in spec.items() if k not in ('model', 'solver')}
+    model = spec['model']
+    if model == 'PNL_OPF':
+        return PNL_OPF(network, **options)
+    if model == 'PTDF_OPF':
+        return PTDF_OPF(network, **options)
+    if model == 'SimpleDispatch':
+        return SimpleDispatch(network, **options)
+    if model == 'DC_PF':
+        return DC_PF(network)
+    return None # AC_PF é reconstruído a cada cenário, pois lê as cargas da rede
+
+
+def _solve(spec: dict, model, load_p: np.ndarray):
+    """
+    Solves one scenario.
+    Returns:
+        columns (dict): Numeric results.
+        names (dict): Element names of the columns.
+    """
+    network = _WORKER['network']
+    arr = network.arrays
+    kind = spec['model']
+    if kind in ('PNL_OPF', 'PTDF_OPF'):
+        start = time.perf_counter()
+        model.update(load_p=load_p)
+        model.solve(solver_name=spec.get('solver', 'ipopt'))
+        result = model.result
+        columns = result.columns()
+        columns['solve_time'] = time.perf_counter() - start
+        names = {k: getattr(result, k) for k in ('gen_names', 'bus_names', 'line_names') if getattr(result, k) is not None}
+        return columns, names
+
+    if kind == 'SimpleDispatch':
+        p, lam = model.dispatch(load_p.sum())
+        quad, cubic = model.costs(p)
+        return {'generation': p[0], 'lambda': lam[0], 'cost_quad': quad[0], 'cost_cubic': cubic[0]}, {'gen_names': arr.gen_names}
+
+    if kind == 'DC_PF':
+        dc = model.arrays
+        P = np.bincount(dc.gen_bus, dc.gen_p, dc.nbus) - np.bincount(dc.load_bus, load_p, dc.nbus)
+        theta, flows = model.solve_series(P[:, None])
+        return {'theta': theta[:, 0], 'flows': flows[:, 0]}, {'bus_names': dc.bus_names, 'line_names': dc.line_names}
+
+    # AC_PF: as cargas do cenário são aplicadas à rede do processo
+    for load, p in zip(network.loads, load_p):
+        load.p_input = p * load.pb
+    pf = AC_PF(network)
+    tol = spec.get('tol', 1e-6)
+    pf.solve(tol_P=tol, tol_Q=tol, max_iter=spec.get('max_iter', 100), method=spec.get('method', 'full'))
+    return {'V': pf.V, 'theta': pf.theta, 'P': pf.P, 'Q': pf.Q, 'converged': pf.converged}, {'bus_names': arr.bus_names}
+
+
+def _run_chunk(f_idx: int, indices: list):
+    """
+    Solves the scenarios `indices` of formulation `f_idx` on a worker, reusing its model.
+    A formulation whose model cannot be built records the error for each of its scenarios.
+    """
+    spec = _WORKER['formulations'][f_idx]
+    models = _WORKER['models']
+
+    def build():
+        # A falha de construção fica guardada no lugar do modelo, para não ser repetida a cada tarefa
+        try:
+            models[f_idx] = _build(spec)
+        except Exception as error:
+            models[f_idx] = error
+
+    if f_idx not in models:
+        build()
+    records, names = [], None
+    for s in indices:
+        if isinstance(models[f_idx], Exception):
+            records.append((s, None, repr(models[f_idx])))
+            continue
+        try:
+            columns, names = _solve(spec, models[f_idx], _WORKER['scenarios'][s])
+            records.append((s, columns, None))
+        except Exception as error:
+            records.append((s, None, repr(error)))
+            if spec['model'] in ('PNL_OPF', 'PTDF_OPF'):
+                build() # Recomeça de um modelo limpo após uma falha
+    return f_idx, records, names
+
+
+def run_batch(network_factory: Callable, formulations: list, scenarios, out: str,
+              workers: Optional[int] = None, chunk_size: Optional[int] = None, verbose: bool = False) -> dict:
+    """
+    Solves every formulation for every load scenario in a process pool, writing the results as they complete.
+    The network factory and the scenarios are sent to each worker once (pool initializer); tasks only
+    carry indices. Each worker builds one model per formulation and re-solves it with update() and warm starts.
+    Args:
+        network_factory (callable): Picklable function or class returning the Network (e.g. systems.three_bus).
+        formulations (list of dict): Formulations, as returned by formulation_grid.
+        scenarios (np.ndarray): Load scenarios (n_scenarios, n_loads) in pu.
+        out (str): Output directory. Formulation k is written to out/fKKK (see read_results),
+            with a 'scenario' column; failed scenarios go to out/errors.jsonl.
+        workers (int, optional): Number of processes. Defaults to the number of usable CPUs; 0 runs in this process.
+        chunk_size (int, optional): Scenarios per task. Defaults to about 4 tasks per worker and formulation.
+        verbose (bool): Whether to print the progress.
+    Returns:
+        dict: Number of solved scenarios per formulation index and the number of errors.
+    """
+    scenarios = np.asarray(scenarios, dtype=float)
+    if scenarios.ndim != 2:
+        raise ValueError("scenarios must have shape (n_scenarios, n_loads).")
+    if workers is None:
+        workers = default_workers()
+    n = len(scenarios)
+    if chunk_size is None:
+        chunk_size = int(min(256, max(1, np.ceil(n / (4 * max(workers, 1))))))
+    tasks = [(f, list(range(start, min(start + chunk_size, n))))
+             for f in range(len(formulations)) for start in range(0, n, chunk_size)]
+
+    os.makedirs(out, exist_ok=True)
+    with open(os.path.join(out, 'formulations.json'), 'w') as f:
+        json.dump(formulations, f, indent=2)
+    writers = {f: ResultsWriter(os.path.join(out, f'f{f:03d}')) for f in range(len(formulations))}
+    summary = {'solved': {f: 0 for f in writers}, 'errors': 0}
+
+    def collect(f_idx, records, names, errors):
+        for s, columns, error in records:
+            if error is None:
+                writers[f_idx].append_columns(columns, names, scenario=s)
+                summary['solved'][f_idx] += 1
+            else:
+                errors.write(json.dumps({'formulation': f_idx, 'scenario': s, 'error': error}) + '\n')
+                summary['errors'] += 1
+
+    start = time.perf_counter()
+    with open(os.path.join(out, 'errors.jsonl'), 'a') as errors:
+        try:
+            if workers == 0:
+                _init_worker(network_factory, scenarios, formulations)
+                for done, task in enumerate(tasks, 1):
+                    collect(*_run_chunk(*task), errors)
+                    if verbose:
+                        print(f"{done}/{len(tasks)} tasks, {time.perf_counter() - start:.1f}s")
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(network_factory, scenarios, formulations)) as pool:
+                    futures = [pool.submit(_run_chunk, *task) for task in tasks]
+                    for done, future in enumerate(as_completed(futures), 1):
+                        collect(*future.result(), errors)
+                        if verbose:
+                            print(f"{done}/{len(tasks)} tasks, {time.perf_counter() - start:.1f}s")
+        finally:
+            for writer in writers.values():
+                writer.close()
+    return summary
+
+
+def _factory(path: str) -> Callable:
+    """Resolves 'package.module.name' or 'package.module:name' to the named object."""
+    module, _, name = path.replace(':', '.').rpartition('.')
+    return getattr(importlib.import_module(module), name)
+
+
+def _bool(text: str) -> bool:
+    if text.lower() not in ('true', 'false', '1', '0'):
+        raise argparse.ArgumentTypeError(f"Expected true or false, got '{text}'.")
+    return text.lower() in ('true', '1')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a grid of formulations over many load scenarios in parallel.")
+    parser.add_argument('network', help="Network factory, e.g. systems.three_bus")
+    parser.add_argument('--out', required=True, help="Output directory")
+    parser.add_argument('--models', nargs='+', default=['PNL_OPF'], choices=MODELS)
+    parser.add_argument('--com-rede', nargs='+', type=_bool, default=[True])
+    parser.add_argument('--is-cubic', nargs='+', type=_bool, default=[True])
+    parser.add_argument('--solver', nargs='+', default=['ipopt'])
+    scenarios = parser.add_mutually_exclusive_group(required=True)
+    scenarios.add_argument('--scale', nargs=3, type=float, metavar=('START', 'STOP', 'N'),
+                           help="Scale all loads by N factors evenly spaced from START to STOP")
+    scenarios.add_argument('--scenarios', help="Path of an .npy matrix (n_scenarios, n_loads) of loads in pu")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    factory = _factory(args.network)
+    if args.scale is not None:
+        start, stop, count = args.scale
+        load_scenarios = scale_scenarios(factory(), np.linspace(start, stop, int(count)))
+    else:
+        load_scenarios = np.load(args.scenarios)
+
+    # Cada modelo recebe apenas as opções que aceita
+    formulations = []
+    for model in args.models:
+        options = {}
+        if model in ('PNL_OPF',):
+            options['com_rede'] = args.com_rede
+        if model in ('PNL_OPF', 'PTDF_OPF', 'SimpleDispatch'):
+            options['is_cubic'] = args.is_cubic
+        if model in ('PNL_OPF', 'PTDF_OPF'):
+            options['solver'] = args.solver
+        formulations += formulation_grid((model,), **options)
+
+    summary = run_batch(factory, formulations, load_scenarios, args.out, workers=args.workers,
+                        chunk_size=args.chunk_size, verbose=True)
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
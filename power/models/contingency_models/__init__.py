@@ -0,0 +1,3 @@
+from .contingency import ContingencyAnalysis, ContingencyResults
+
+__all__ = ["ContingencyAnalysis", "ContingencyResults"]
@@ -0,0 +1,334 @@
+import itertools
+import numpy as np
+import scipy.sparse as sp
+from dataclasses import dataclass, replace
+from typing import List, Optional, Sequence, Union
+from power.models.electricity_models import *
+from power.models.power_flow_models import AC_PF, DC_PF
+from power.models.utils import FrozenArrays, pandas
+
+@dataclass(frozen=True)
+class ContingencyResults(FrozenArrays):
+    """
+    Ranked outcome of a contingency screening, as NumPy arrays.
+    Cases are sorted from the most to the least loaded; islanding cases (outages that split the
+    network) come last. Loadings are |flow| / Line.flow_max (lines without a limit have zero loading).
+    The ac_* fields are filled by ContingencyAnalysis.ac_check for the re-solved cases.
+    """
+    line_names: List[str]
+    outages: np.ndarray # (n_cases, 2) índices das linhas desligadas, -1 na segunda coluna para N-1
+    max_loading: np.ndarray # Maior carregamento pós-contingência de cada caso (NaN em ilhamentos)
+    worst_line: np.ndarray # Linha mais carregada de cada caso (-1 se nenhuma)
+    n_overloads: np.ndarray # Número de linhas acima do limiar
+    islanding: np.ndarray # O caso separa a rede em ilhas
+    threshold: float
+    # Sobrecargas (uma por caso e linha acima do limiar)
+    overload_case: np.ndarray
+    overload_line: np.ndarray
+    overload_flow: np.ndarray # Fluxo DC pós-contingência (pu)
+    overload_loading: np.ndarray
+    # Resolução AC dos casos críticos
+    ac_cases: Optional[np.ndarray] = None # Casos (posições em outages) resolvidos em AC
+    ac_converged: Optional[np.ndarray] = None
+    ac_max_loading: Optional[np.ndarray] = None
+    ac_worst_line: Optional[np.ndarray] = None
+    ac_min_voltage: Optional[np.ndarray] = None
+    ac_flows: Optional[np.ndarray] = None # (n_ac, n_lines) fluxos Pij (pu)
+    ac_v: Optional[np.ndarray] = None # (n_ac, n_buses) tensões (pu)
+
+    def __len__(self) -> int:
+        return len(self.outages)
+
+    def labels(self) -> List[str]:
+        """Name of each case, e.g. 'Line 3' or 'Line 3 + Line 7'."""
+        return [' + '.join(self.line_names[k] for k in pair if k >= 0) for pair in self.outages]
+
+    def critical(self, threshold: Optional[float] = None) -> np.ndarray:
+        """Positions of the non-islanding cases whose DC loading reaches threshold (the screening one by default)."""
+        threshold = self.threshold if threshold is None else threshold
+        return np.flatnonzero(~self.islanding & (np.nan_to_num(self.max_loading, nan=0.0) >= threshold))
+
+    def to_frame(self):
+        """One row per case with the DC screening and, when available, the AC re-solve."""
+        pd = pandas()
+        names = np.asarray(self.line_names + [None], dtype=object)
+        frame = pd.DataFrame({
+            'Outage': self.labels(),
+            'Max Loading': self.max_loading,
+            'Worst Line': names[self.worst_line],
+            'Overloads': self.n_overloads,
+            'Islanding': self.islanding,
+        })
+        if self.ac_cases is not None:
+            for column, values in (('AC Converged', self.ac_converged), ('AC Max Loading', self.ac_max_loading),
+                                   ('AC Worst Line', names[self.ac_worst_line]), ('AC Min Voltage', self.ac_min_voltage)):
+                column_values = np.full(len(self), None, dtype=object)
+                column_values[self.ac_cases] = values
+                frame[column] = column_values
+        return frame
+
+
+class ContingencyAnalysis:
+    """
+    N-1 and N-2 branch outage screening with one base-case factorization.
+    Post-outage DC flows come from the Line Outage Distribution Factors (Network.LODF), i.e. the
+    rank-1 (N-1) and rank-2 (N-2) updates of the base-case B matrix, evaluated for blocks of outages
+    at once. Cases are ranked by their loading against Line.flow_max and only the critical ones
+    are re-solved with the full AC power flow (ac_check), warm started from the base case.
+    """
+    def __init__(self, network: Network, flows: Optional[np.ndarray] = None, threshold: float = 1.0,
+                 block_size: int = 512, flow_max: Optional[np.ndarray] = None):
+        """
+        Args:
+            network (Network): The network.
+            flows (np.ndarray, optional): Base-case active flows from -> to (pu), e.g. of an OPF dispatch.
+                Defaults to the DC power flow of the network injections.
+            threshold (float): Loading (fraction of flow_max) above which a line is overloaded.
+            block_size (int): Number of outages evaluated at once.
+            flow_max (np.ndarray, optional): Line limits (pu) to rank against, e.g. emergency ratings.
+                Defaults to Line.flow_max.
+        """
+        self.network = network
+        self.threshold = threshold
+        self.block_size = block_size
+
+        arr = network.arrays
+        self.line_names = arr.line_names
+        self.flow_max = arr.flow_max if flow_max is None else np.asarray(flow_max, dtype=float)
+        if self.flow_max.shape != (arr.nline,):
+            raise ValueError(f"flow_max must have shape ({arr.nline},), got {self.flow_max.shape}.")
+        if flows is None:
+            pf = DC_PF(network)
+            pf.solve()
+            flows = pf.get_line_flows()
+        flows = np.asarray(flows, dtype=float)
+        if flows.shape != (arr.nline,):
+            raise ValueError(f"flows must have shape ({arr.nline},), got {flows.shape}.")
+        self.flows = flows
+        self._base_ac = None
+
+    def loading(self, flows: np.ndarray) -> np.ndarray:
+        """|flows| / flow_max along the first axis (zero for lines without a limit)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            loading = np.abs(flows) / self.flow_max.reshape((-1,) + (1,) * (np.ndim(flows) - 1))
+        return np.nan_to_num(loading, nan=0.0, posinf=np.inf)
+
+    def _selection(self, lines) -> np.ndarray:
+        return Network._selection(lines, self.network.line_idx, len(self.network.lines))
+
+    def post_outage_flows(self, outages: Sequence[Union[Line, int]]) -> np.ndarray:
+        """
+        DC flows (pu) after the simultaneous outage of the given lines (any number), from the LODF
+        of the outaged lines: the flows they carried are redistributed by solving a small system.
+        Raises a ValueError if the outage splits the network.
+        """
+        outs = self._selection(outages)
+        L = self.network.LODF(outages=outs)
+        # Fluxos equivalentes das linhas desligadas: f~_k - sum_{j != k} LODF[k, j] f~_j = f_k
+        M = -L[outs]
+        M[np.diag_indices(len(outs))] = 1
+        if np.isnan(L).any() or abs(np.linalg.det(M)) < 1e-10:
+            raise ValueError("The outage splits the network.")
+        transfer = np.linalg.solve(M, self.flows[outs])
+        flows = self.flows + L @ transfer
+        flows[outs] = 0
+        return flows
+
+    def screen(self, level: int = 1, outages: Optional[Sequence[Union[Line, int]]] = None,
+               pairs: Optional[Sequence] = None) -> ContingencyResults:
+        """
+        DC screening of every single (level 1) or double (level 2) branch outage.
+        Args:
+            level (int): 1 for N-1, 2 for N-2.
+            outages (list, optional): Candidate outaged lines (Line objects or indices). All lines if None.
+            pairs (list, optional): For level 2, explicit pairs of lines to outage instead of
+                every pair of candidates.
+        Returns:
+            ContingencyResults: Cases ranked by their maximum loading.
+        """
+        if level not in (1, 2):
+            raise ValueError(f"level must be 1 or 2, got {level}.")
+        if level == 1:
+            cases = self._selection(outages)[:, None]
+            blocks = (self._screen_n1(cases[start:start + self.block_size, 0])
+                      for start in range(0, len(cases), self.block_size))
+        else:
+            if pairs is not None:
+                cases = np.array([self._selection(pair) for pair in pairs], dtype=np.int64).reshape(-1, 2)
+                if np.any(cases[:, 0] == cases[:, 1]):
+                    raise ValueError("A pair must have two different lines.")
+            else:
+                candidates = self._selection(outages)
+                cases = np.array(list(itertools.combinations(candidates, 2)), dtype=np.int64).reshape(-1, 2)
+            blocks = self._screen_n2(cases)
+        if len(cases) == 0:
+            raise ValueError("No outage to screen.")
+        return self._rank(cases, list(blocks), level)
+
+    def _summary(self, post: np.ndarray, islanding: np.ndarray) -> tuple:
+        """Per-case maximum loading, worst line and overloads of a block of post-outage flows (n_lines, b)."""
+        loading = self.loading(post)
+        loading[:, islanding] = 0
+        cols = np.arange(loading.shape[1])
+        worst = np.argmax(loading, axis=0)
+        max_loading = loading[worst, cols]
+        worst = np.where(max_loading > 0, worst, -1)
+        max_loading[islanding] = np.nan
+
+        lines, cases = np.nonzero(loading > self.threshold)
+        over = (cases, lines, post[lines, cases], loading[lines, cases])
+        n_overloads = np.bincount(cases, minlength=loading.shape[1])
+        return max_loading, worst, n_overloads, islanding, over
+
+    def _screen_n1(self, block: np.ndarray) -> tuple:
+        L = self.network.LODF(outages=block)
+        islanding = np.isnan(L).any(axis=0)
+        post = self.flows[:, None] + np.nan_to_num(L) * self.flows[block]
+        post[block, np.arange(len(block))] = 0
+        return self._summary(post, islanding)
+
+    def _screen_n2(self, cases: np.ndarray):
+        # LODF de todas as linhas que aparecem nos pares, calculado uma única vez
+        lines, pos = np.unique(cases, return_inverse=True)
+        pos = pos.reshape(cases.shape)
+        L = self.network.LODF(outages=lines)
+        bridge = np.isnan(L).any(axis=0)
+        L = np.nan_to_num(L)
+        f = self.flows
+        for start in range(0, len(cases), self.block_size):
+            k, m = cases[start:start + self.block_size].T
+            a, b = pos[start:start + self.block_size].T
+            # Atualização de posto 2: fluxos equivalentes das duas linhas desligadas
+            l_km, l_mk = L[k, b], L[m, a]
+            den = 1 - l_km * l_mk
+            islanding = bridge[a] | bridge[b] | (np.abs(den) < 1e-10)
+            den[islanding] = 1
+            fk = (f[k] + l_km * f[m]) / den
+            fm = (f[m] + l_mk * f[k]) / den
+            post = f[:, None] + L[:, a] * fk + L[:, b] * fm
+            cols = np.arange(len(k))
+            post[k, cols] = 0
+            post[m, cols] = 0
+            yield self._summary(post, islanding)
+
+    def _rank(self, cases: np.ndarray, blocks: list, level: int) -> ContingencyResults:
+        columns = [np.concatenate([b[i] for b in blocks]) for i in range(4)]
+        max_loading, worst, n_overloads, islanding = columns
+        # Sobrecargas: índice do caso deslocado pelo início de cada bloco
+        offsets = np.cumsum([0] + [len(b[0]) for b in blocks])
+        over_case = np.concatenate([b[4][0] + offset for b, offset in zip(blocks, offsets)])
+        over_line, over_flow, over_loading = (np.concatenate([b[4][i] for b in blocks]) for i in (1, 2, 3))
+
+        order = np.argsort(np.where(islanding, np.inf, -max_loading), kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        over_case = rank[over_case]
+        over_order = np.lexsort((-over_loading, over_case))
+
+        outages = np.full((len(cases), 2), -1, dtype=np.int64)
+        outages[:, :level] = cases
+        return ContingencyResults(
+            line_names=list(self.line_names),
+            outages=outages[order],
+            max_loading=max_loading[order],
+            worst_line=worst[order],
+            n_overloads=n_overloads[order],
+            islanding=islanding[order],
+            threshold=self.threshold,
+            overload_case=over_case[over_order],
+            overload_line=over_line[over_order],
+            overload_flow=over_flow[over_order],
+            overload_loading=over_loading[over_order],
+        )
+
+    def outage_ybus(self, outages: Sequence[Union[Line, int]]) -> sp.csr_matrix:
+        """Y bus of the network without the given lines (base Y bus minus their two-port elements)."""
+        sel = self._selection(outages)
+        f, t, Yff, Yft, Ytf, Ytt = self.network.arrays.branch_admittances()
+        n = len(self.network.buses)
+        rows = np.concatenate((f[sel], f[sel], t[sel], t[sel]))
+        cols = np.concatenate((f[sel], t[sel], f[sel], t[sel]))
+        data = np.concatenate((Yff[sel], Yft[sel], Ytf[sel], Ytt[sel]))
+        ybus = (self.network.y_bus() - sp.coo_matrix((data, (rows, cols)), shape=(n, n))).tocsr()
+        ybus.sort_indices()
+        return ybus
+
+    def base_ac(self, tol: float = 1e-6, max_iter: int = 30) -> AC_PF:
+        """AC power flow of the intact network, solved once and used as the warm start of ac_check."""
+        if self._base_ac is None:
+            pf = AC_PF(self.network)
+            pf.solve(tol_P=tol, tol_Q=tol, max_iter=max_iter)
+            self._base_ac = pf
+        return self._base_ac
+
+    def ac_solve(self, outages: Sequence[Union[Line, int]], tol: float = 1e-6, max_iter: int = 30,
+                 method: str = 'full') -> AC_PF:
+        """
+        Full AC power flow with the given lines out of service, warm started from the base case.
+        Only the Newton methods ('full', 'reduced') are supported: the fast decoupled matrices
+        are built from the intact network.
+        Returns:
+            AC_PF: The solved power flow. Its `converged` attribute tells if the tolerance was met.
+        """
+        if method not in ('full', 'reduced'):
+            raise ValueError(f"Unknown method '{method}'. Use 'full' or 'reduced'.")
+        base = self.base_ac(tol, max_iter)
+        pf = AC_PF(self.network)
+        pf.Ybus = self.outage_ybus(outages)
+        pf.G = sp.csr_matrix((pf.Ybus.data.real, pf.Ybus.indices, pf.Ybus.indptr), shape=pf.Ybus.shape)
+        pf.B = sp.csr_matrix((pf.Ybus.data.imag, pf.Ybus.indices, pf.Ybus.indptr), shape=pf.Ybus.shape)
+        pf.theta_0 = np.deg2rad(base.theta)
+        pf.V_0 = base.V.copy()
+        pf.solve(tol_P=tol, tol_Q=tol, max_iter=max_iter, method=method)
+        return pf
+
+    def ac_check(self, results: ContingencyResults, cases: Optional[Sequence[int]] = None, top: Optional[int] = None,
+                 threshold: Optional[float] = None, tol: float = 1e-6, max_iter: int = 30,
+                 method: str = 'full') -> ContingencyResults:
+        """
+        Re-solves the critical cases of a screening with the full AC power flow.
+        Args:
+            results (ContingencyResults): Output of screen.
+            cases (list, optional): Positions of the cases to re-solve. Defaults to results.critical(threshold).
+            top (int, optional): Re-solve at most the `top` worst of those cases.
+            threshold (float, optional): Critical DC loading. Defaults to the screening threshold.
+            tol, max_iter, method: Options of the AC power flow (see ac_solve).
+        Returns:
+            ContingencyResults: A copy of results with the ac_* fields. Islanding cases are not re-solved.
+        """
+        if cases is None:
+            cases = results.critical(threshold)
+        cases = np.asarray(cases, dtype=np.int64)
+        cases = cases[~results.islanding[cases]]
+        if top is not None:
+            cases = cases[:top]
+
+        arr = self.network.arrays
+        converged = np.zeros(len(cases), dtype=bool)
+        flows = np.full((len(cases), arr.nline), np.nan)
+        V = np.full((len(cases), arr.nbus), np.nan)
+        for i, case in enumerate(cases):
+            outs = results.outages[case][results.outages[case] >= 0]
+            with np.errstate(all='ignore'):
+                pf = self.ac_solve(outs, tol, max_iter, method)
+                converged[i] = pf.converged
+                if pf.converged:
+                    flows[i] = pf.get_line_flows()[0]
+                    flows[i, outs] = 0
+                    V[i] = pf.V
+
+        # Carregamento e tensão mínima apenas dos casos convergidos
+        max_loading = np.full(len(cases), np.nan)
+        worst = np.full(len(cases), -1, dtype=np.int64)
+        min_voltage = np.full(len(cases), np.nan)
+        if converged.any():
+            loading = self.loading(flows[converged].T)
+            max_loading[converged] = loading.max(axis=0)
+            worst[converged] = np.where(loading.max(axis=0) > 0, np.argmax(loading, axis=0), -1)
+            min_voltage[converged] = V[converged].min(axis=1)
+        return replace(results, ac_cases=cases, ac_converged=converged, ac_max_loading=max_loading,
+                       ac_worst_line=worst, ac_min_voltage=min_voltage, ac_flows=flows, ac_v=V)
+
+    def run(self, level: int = 1, outages=None, pairs=None, top: Optional[int] = None, **ac_options) -> ContingencyResults:
+        """Screens the outages (see screen) and re-solves the critical cases in AC (see ac_check)."""
+        return self.ac_check(self.screen(level, outages, pairs), top=top, **ac_options)
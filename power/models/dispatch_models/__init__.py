@@ -0,0 +1,3 @@
+from .simple_dispatch import SimpleDispatch
+
+__all__ = ["SimpleDispatch"]
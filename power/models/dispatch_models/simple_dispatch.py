@@ -1,2 +1,151 @@
 from power.models.electricity_models import *
+import numpy as np
+import pandas as pd
 
+class SimpleDispatch:
+    """
+    Economic dispatch without network (the com_rede=False case of PNL_OPF) solved in closed form with NumPy.
+    The system lambda is found by bisection on the marginal cost curves, with each unit clamped to
+    [p_min, p_max], for many load levels at once. Costs must be convex (nondecreasing marginal costs).
+    """
+    def __init__(self, network: Network, is_cubic=True, tol=1e-10, max_iter=200):
+        """
+        Args:
+            network (Network): The network (only its generators and loads are used).
+            is_cubic (bool): Cubic (True) or quadratic (False) costs, as in PNL_OPF:
+                quadratic cost a + b p + c p^2, cubic cost a p + b/2 p^2 + c/3 p^3 (p in pu).
+            tol (float): Relative tolerance of the system lambda.
+            max_iter (int): Maximum number of bisection steps.
+        """
+        self.net = network
+        self.is_cubic = is_cubic
+        self.tol = tol
+        self.max_iter = max_iter
+
+        arr = network.arrays
+        if len(arr.gen_names) == 0:
+            raise ValueError("A rede não possui geradores.")
+        self.gen_names = arr.gen_names
+        self.p_min = arr.gen_p_min
+        self.p_max = arr.gen_p_max
+        self.cost_a = arr.gen_cost_a
+        self.cost_b = arr.gen_cost_b
+        self.cost_c = arr.gen_cost_c
+
+        # Marginal cost c0 + c1 p + c2 p^2 de cada gerador
+        if is_cubic:
+            self._mc = (self.cost_a, self.cost_b, self.cost_c)
+        else:
+            self._mc = (self.cost_b, 2 * self.cost_c, np.zeros_like(self.cost_c))
+        c0, c1, c2 = self._mc
+        if np.any(c2 < 0) or np.any(c1 + 2 * c2 * self.p_min < 0):
+            raise ValueError("Os custos devem ser convexos (custo marginal não decrescente) para o despacho econômico.")
+
+    def marginal_cost(self, p) -> np.ndarray:
+        """Marginal cost of each generator at generation p (pu), broadcast over the last axis."""
+        c0, c1, c2 = self._mc
+        return c0 + c1 * p + c2 * p**2
+
+    def generation(self, lam) -> np.ndarray:
+        """
+        Generation of each unit at system lambda `lam` (inverse of the marginal cost curves, clamped).
+        Units with constant marginal cost go to p_max above it and stay at p_min otherwise.
+        Args:
+            lam (np.ndarray): System lambdas, shape (L,).
+        Returns:
+            p (np.ndarray): Generation (pu), shape (L, n_generators).
+        """
+        c0, c1, c2 = self._mc
+        d = np.asarray(lam, dtype=float)[:, None] - c0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Raiz positiva de c2 p^2 + c1 p - d = 0, na forma estável 2d / (c1 + sqrt(c1^2 + 4 c2 d))
+            root = 2 * d / (c1 + np.sqrt(np.maximum(c1**2 + 4 * c2 * d, 0)))
+        flat = (c1 == 0) & (c2 == 0)
+        p = np.where(flat, np.where(d > 0, np.inf, -np.inf), np.where(d > 0, root, np.minimum(root, 0)))
+        p = np.where(np.isnan(p), -np.inf, p) # d < 0 sem raiz real: abaixo do custo marginal mínimo
+        return np.clip(p, self.p_min, self.p_max)
+
+    def dispatch(self, load) -> tuple:
+        """
+        Vectorized economic dispatch of several load levels.
+        Args:
+            load (float or np.ndarray): Total system load (pu), scalar or shape (L,).
+        Returns:
+            p (np.ndarray): Generation (pu), shape (L, n_generators).
+            lam (np.ndarray): System lambda (marginal cost, $/pu) of each load level, shape (L,).
+        """
+        D = np.atleast_1d(np.asarray(load, dtype=float))
+        p_min_total, p_max_total = self.p_min.sum(), self.p_max.sum()
+        if np.any(D < p_min_total - 1e-12) or np.any(D > p_max_total + 1e-12):
+            raise ValueError(f"Carga fora dos limites de geração [{p_min_total}, {p_max_total}] pu.")
+
+        # Intervalo inicial: nenhum gerador acima de p_min em lo; em hi, cada gerador já supre min(p_max, D)
+        lo = np.full(D.shape, np.min(self.marginal_cost(self.p_min)))
+        top = np.minimum(self.p_max, D.max())
+        hi = np.full(D.shape, np.max(self.marginal_cost(top)))
+        lo, hi = lo - 1e-9 * (1 + abs(lo)), hi + 1e-9 * (1 + abs(hi))
+
+        for _ in range(self.max_iter):
+            mid = 0.5 * (lo + hi)
+            below = self.generation(mid).sum(axis=1) < D
+            lo = np.where(below, mid, lo)
+            hi = np.where(below, hi, mid)
+            if np.all(hi - lo <= self.tol * (1 + np.abs(hi))):
+                break
+
+        # Interpola entre as gerações dos extremos do intervalo para fechar o balanço exatamente
+        # (reparte a carga entre as unidades de custo marginal constante igual a lambda)
+        p_lo, p_hi = self.generation(lo), self.generation(hi)
+        P_lo, P_hi = p_lo.sum(axis=1), p_hi.sum(axis=1)
+        gap = P_hi - P_lo
+        w = np.divide(D - P_lo, gap, out=np.zeros_like(D), where=gap > 0)
+        p = p_lo + w[:, None] * (p_hi - p_lo)
+        return p, 0.5 * (lo + hi)
+
+    def costs(self, p) -> tuple:
+        """
+        Quadratic and cubic costs of each load level of a generation matrix (L, n_generators).
+        Returns:
+            total_cost_quad, total_cost_cubic (np.ndarray): Shape (L,).
+        """
+        a, b, c = self.cost_a, self.cost_b, self.cost_c
+        total_cost_quad = np.sum(a + b * p + c * p**2, axis=1)
+        total_cost_cubic = np.sum(a * p + (b / 2) * p**2 + (c / 3) * p**3, axis=1)
+        return total_cost_quad, total_cost_cubic
+
+    def solve(self, load=None):
+        """
+        Solves the dispatch and returns the results in the format of PNL_OPF.solve (com_rede=False).
+        Args:
+            load (float or np.ndarray, optional): Total system load (pu), scalar or one value per load level.
+                Defaults to the total load of the network.
+        Returns:
+            results (pd.DataFrame): One-row DataFrame. With several load levels, each value is a list
+                with one entry per level, as in PNL_OPF_MP.
+        """
+        scalar = load is None or np.ndim(load) == 0
+        if load is None:
+            load = self.net.arrays.load_p.sum()
+        p, lam = self.dispatch(load)
+        total_cost_quad, total_cost_cubic = self.costs(p)
+        objective = total_cost_cubic if self.is_cubic else total_cost_quad
+
+        if scalar:
+            results_dict = {
+                'Objective Value': float(objective[0]),
+                'Total Cost Quad': f'Total Cost Quad: $ {total_cost_quad[0]}',
+                'Total Cost Cubic': f'Total Cost Cubic $ {total_cost_cubic[0]}',
+                'Generators Power (pu)': dict(zip(self.gen_names, p[0].tolist())),
+                'System Lambda': float(lam[0]),
+            }
+        else:
+            results_dict = {
+                'Objective Value': float(objective.sum()),
+                'Total Cost Quad': f'Total Cost Quad: $ {total_cost_quad.sum()}',
+                'Total Cost Cubic': f'Total Cost Cubic $ {total_cost_cubic.sum()}',
+                'Generators Power (pu)': dict(zip(self.gen_names, p.T.tolist())),
+                'System Lambda': lam.tolist(),
+            }
+
+        self.results = pd.DataFrame([results_dict])
+        return self.results
@@ -39,7 +39,18 @@ class Bus:
 
         # Add the bus to the network
         self.network.buses.append(self)
+        self.network.invalidate()
     
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if 'network' not in self.__dict__ or name in ('network', 'id', 'name', 'loads', 'generators'):
+            return
+        # Shunt and type changes invalidate the cached Y bus of the network, the rest only its arrays
+        if name in ('Sh', 'Sb', 'bus_type'):
+            self.network.invalidate()
+        else:
+            self.network.invalidate('arrays')
+
     @property
     def theta_rad(self) -> float:
         return np.deg2rad(self.theta)
@@ -64,10 +75,12 @@ class Bus:
     def add_generator(self, generator: 'Generator'):
         if generator not in self.generators:
             self.generators.append(generator)
+            self.network.invalidate('arrays')
 
     def add_load(self, load: 'Load'):
         if load not in self.loads:
             self.loads.append(load)
+            self.network.invalidate('arrays')
 
     def __repr__(self):
         return (f"Bus(id={self.id}, type={self.bus_type}, v={self.v:.3f} pu, "
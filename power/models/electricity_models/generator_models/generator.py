@@ -39,6 +39,12 @@ class Generator:
         self.network = self.bus.network
         self.network.generators.append(self)
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Data changes invalidate the cached arrays of the network
+        if name not in ('id', 'name', 'network') and 'network' in self.__dict__:
+            self.network.invalidate('arrays')
+
     @property
     def p(self) -> float:
         return self.p_input / self.pb
@@ -40,6 +40,13 @@ class Line:
         
         self.network = self.from_bus.network #Add network to line
         self.network.lines.append(self) #Add line to network
+        self.network.invalidate()
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Electrical parameter changes invalidate the cached Y bus of the network
+        if name not in ('id', 'name', 'network') and 'network' in self.__dict__:
+            self.network.invalidate()
 
     @property
     def zb(self) -> float:
@@ -41,6 +41,12 @@ class Load:
         self.network = self.bus.network
         self.network.loads.append(self)
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Data changes invalidate the cached arrays of the network
+        if name not in ('id', 'name', 'network') and 'network' in self.__dict__:
+            self.network.invalidate('arrays')
+
     @property
     def p(self) -> float:
         return self.p_input / self.pb
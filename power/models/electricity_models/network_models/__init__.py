@@ -1,3 +1,6 @@
 from .network import Network
+from .network_arrays import NetworkArrays
+from .z_bus import ZBus
+from .topology import Island, find_islands, island_network
 
-__all__ = ["Network"]
\ No newline at end of file
+__all__ = ["Network", "NetworkArrays", "ZBus", "Island", "find_islands", "island_network"]
\ No newline at end of file
@@ -1,11 +1,48 @@
 import numpy as np
+import scipy.sparse as sp
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import List, Optional, Sequence, Union
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
 
 from power.models.electricity_models.bus_models import *
 from power.models.electricity_models.line_models import *
 from power.models.electricity_models.load_models import *
 from power.models.electricity_models.generator_models import *
+from power.models.electricity_models.network_models.network_arrays import NetworkArrays
+from power.models.electricity_models.network_models.z_bus import ZBus
+
+class ElementList(list):
+    """
+    List of network elements that clears the cache of its network when it is changed in place
+    (append, pop, del, slice assignment, ...), so that derived data never outlives the topology.
+    """
+    network = None # Também durante o unpickling, em que os itens são restaurados antes dos atributos
+
+    def __init__(self, items=(), network: Optional["Network"] = None):
+        super().__init__(items)
+        self.network = network
+
+    def _changed(self):
+        if self.network is not None:
+            self.network.invalidate()
+
+    def _mutator(name):
+        method = getattr(list, name)
+
+        def mutate(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            self._changed()
+            return result
+        mutate.__name__ = name
+        mutate.__doc__ = method.__doc__
+        return mutate
+
+    for _name in ('append', 'extend', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse',
+                  '__setitem__', '__delitem__', '__iadd__', '__imul__'):
+        locals()[_name] = _mutator(_name)
+    del _name, _mutator
+
 
 @dataclass
 class Network:
@@ -16,34 +53,142 @@ class Network:
     loads: List[Load] = field(default_factory=list)
     generators: List[Generator] = field(default_factory=list)
 
+    # Cache of derived data (bus map, Y bus, ...). Cleared by invalidate().
+    _cache: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        if name in ('buses', 'lines', 'loads', 'generators'):
+            value = ElementList(value, self)
+        super().__setattr__(name, value)
+        if name in ('buses', 'lines', 'loads', 'generators'):
+            self.invalidate()
+
+    def __getstate__(self):
+        # Derived data (factorizations included) is not pickled, it is rebuilt on demand
+        state = self.__dict__.copy()
+        state['_cache'] = {}
+        return state
+
+    def invalidate(self, *keys: str):
+        """
+        Clears cached derived data of the network.
+        Called automatically when buses, lines or their electrical parameters change.
+        Args:
+            keys (str, optional): Cache entries to drop. If none is given, the whole cache is cleared.
+        """
+        cache = self.__dict__.get('_cache')
+        if cache is None:
+            return
+        if not keys:
+            cache.clear()
+        for key in keys:
+            cache.pop(key, None)
+
     @property
     def bus_idx(self) -> dict:
         """
         Returns a dictionary mapping bus IDs to their indices in the buses list.
         This is useful for quickly accessing buses by their ID.
         """
-        return {bus.id: i for i, bus in enumerate(self.buses)}
-    
-    def y_bus(self) -> np.ndarray:
+        if 'bus_idx' not in self._cache:
+            self._cache['bus_idx'] = {bus.id: i for i, bus in enumerate(self.buses)}
+        return self._cache['bus_idx']
+
+    @property
+    def line_idx(self) -> dict:
+        """
+        Returns a dictionary mapping line IDs to their indices in the lines list.
+        """
+        if 'line_idx' not in self._cache:
+            self._cache['line_idx'] = {line.id: i for i, line in enumerate(self.lines)}
+        return self._cache['line_idx']
+
+    @property
+    def arrays(self) -> NetworkArrays:
+        """
+        Returns the columnar (struct-of-arrays) per-unit view of the network.
+        Built once and cached until a bus, line, generator or load changes.
+        """
+        if 'arrays' not in self._cache:
+            self._cache['arrays'] = NetworkArrays.from_network(self)
+        return self._cache['arrays']
+
+    @property
+    def dc_arrays(self) -> NetworkArrays:
+        """
+        Returns the DC projection of the network arrays (see NetworkArrays.dc).
+        Unlike ACtoDC, the network itself is left untouched.
+        """
+        return self.arrays.dc
+
+    def load_p_series(self) -> np.ndarray:
+        """
+        Returns the load curves (Load.p_input_series) as a matrix of shape (n_loads, T), in pu.
+        Loads without a curve keep their scalar p over the whole horizon.
+        """
+        lengths = {len(load.p_input_series) for load in self.loads if len(load.p_input_series) > 0}
+        if not lengths:
+            raise ValueError("No load has a p_input_series.")
+        if len(lengths) > 1:
+            raise ValueError(f"All load series must have the same length, got {sorted(lengths)}.")
+        T = lengths.pop()
+
+        load_p = np.empty((len(self.loads), T))
+        for k, load in enumerate(self.loads):
+            load_p[k] = load.p_series if len(load.p_input_series) > 0 else load.p
+        return load_p
+
+    def branch_admittances(self):
+        """
+        Returns the two-port admittance elements of every line as arrays.
+        Returns:
+            f, t (np.ndarray): From and to bus indices of each line.
+            Yff, Yft, Ytf, Ytt (np.ndarray): Admittance elements of each line (pu).
+        """
+        return self.arrays.branch_admittances()
+
+    def y_bus(self, dense: bool = False):
         """
         Returns the Y bus matrix of the network.
+        The sparse matrix is assembled once and cached until the network changes.
+        Args:
+            dense (bool): If True, returns a dense copy instead of the cached sparse matrix.
+        Returns:
+            Y_bus (sp.csr_matrix or np.ndarray): The Y bus matrix of the network.
         """
-        n = len(self.buses)
-        ybus = np.zeros((n, n), dtype=complex)
-        for line in self.lines: #Adiciona os elementos de admitância da linha
-            for (i, j), y in line.get_admittance_elements(self.bus_idx):
-                ybus[i, j] += y
-        
-        for i, bus in enumerate(self.buses):
-            ybus[i, i] += bus.shunt
-    
-        return ybus
-        
-    def get_G(self):
-        return np.asarray(self.y_bus(), dtype=np.complex128).real
-    
-    def get_B(self):
-        return np.asarray(self.y_bus(), dtype=np.complex128).imag
+        if 'y_bus' not in self._cache:
+            self._cache['y_bus'] = self.arrays.y_bus()
+
+        ybus = self._cache['y_bus']
+        return ybus.toarray() if dense else ybus
+
+    def get_G(self, dense: bool = False):
+        """Real part of the Y bus (sparse, shares the structure of the cached Y bus)."""
+        if 'G' not in self._cache:
+            ybus = self.y_bus()
+            self._cache['G'] = sp.csr_matrix((ybus.data.real, ybus.indices, ybus.indptr), shape=ybus.shape)
+        G = self._cache['G']
+        return G.toarray() if dense else G
+
+    def get_B(self, dense: bool = False):
+        """Imaginary part of the Y bus (sparse, shares the structure of the cached Y bus)."""
+        if 'B' not in self._cache:
+            ybus = self.y_bus()
+            self._cache['B'] = sp.csr_matrix((ybus.data.imag, ybus.indices, ybus.indptr), shape=ybus.shape)
+        B = self._cache['B']
+        return B.toarray() if dense else B
+
+    def z_bus(self, ref_bus: Optional[Bus] = None, z_tie: Optional[complex] = None) -> ZBus:
+        """
+        Returns an on-demand Z bus accessor backed by a sparse LU factorization of the Y bus.
+        Columns, rows, entries or submatrices are computed only when requested, and cached.
+        Args:
+            ref_bus (Bus, optional): The bus to reference the Z bus matrix to. If None, the Z bus is not referenced.
+            z_tie (complex, optional): The impedance of a tie line between ref_bus and ground.
+        Returns:
+            Z_bus (ZBus): The Z bus accessor.
+        """
+        return ZBus(self, ref_bus, z_tie)
 
     def get_Z_bus(self, ref_bus: Optional[Bus] = None) -> np.ndarray:
         """
@@ -53,15 +198,7 @@ class Network:
         Returns:
             Z_bus (np.ndarray): The Z bus matrix of the network.
         """
-        Z = np.linalg.inv(self.y_bus())
-        if ref_bus is None:
-            return Z
-        
-        if ref_bus.id not in self.bus_idx:
-            raise ValueError(f"Bus {ref_bus.id} is not part of the network.")
-        s = self.bus_idx[ref_bus.id]
-        Zs = (Z - Z[:, [s]] - Z[[s], :] + Z[s, s])
-        return Zs
+        return self.z_bus(ref_bus).toarray()
     
     def get_Z_bus_arb_tie(self, ref_bus: Bus, z_tie: complex) -> np.ndarray:
         """
@@ -72,44 +209,220 @@ class Network:
         Returns:
             Z_bus (np.ndarray): The Z bus matrix of the network with the tie line.
         """
-
-        # Ground referenced Z bus
-        Z = self.get_Z_bus()
-
-        if ref_bus.id not in self.bus_idx:
-            raise ValueError(f"Bus {ref_bus.id} is not part of the network.")
-        
-        s = self.bus_idx[ref_bus.id]
-
-        #Denominator:
-        denom = Z[s, s] + z_tie
-        if denom == 0:
-            raise ValueError("The denominator for the Z bus with tie line is zero, check the impedance values.")
-        
-        Z_tie = Z - np.outer(Z[:, s], Z[s, :]) / denom
-        
-        return Z_tie
+        return self.z_bus(ref_bus, z_tie).toarray()
     
     def CTDF(self, ref_bus: Optional[Bus] = None, z_tie: Optional[complex] = None) -> np.ndarray:
         """
         Current Transfer Distribution Factors (CTDF) for the network.
+        Only the Z bus rows of the line terminal buses are computed.
         Args:
             ref_bus (Bus, optional): The bus to reference the CTDF to. If None, the CTDF is not referenced.
             z_tie (complex, optional): The impedance of a tie line. If None, no tie line is considered.
         """
+        Zbus = self.z_bus(ref_bus, z_tie) if ref_bus is not None else self.z_bus()
+        arr = self.arrays
+        impedance = arr.r + 1j * arr.x
+        if np.any(impedance == 0):
+            line = self.lines[int(np.flatnonzero(impedance == 0)[0])]
+            raise ZeroDivisionError(f"Impedance of {line.name} is zero!")
+
+        ends = np.unique(np.concatenate((arr.f, arr.t)))
+        pos = np.zeros(arr.nbus, dtype=np.int64)
+        pos[ends] = np.arange(len(ends))
+        Z_rows = Zbus.rows(ends)
+        CTDF = (Z_rows[pos[arr.f]] - Z_rows[pos[arr.t]]) / impedance[:, None]
+        return CTDF
+
+    def incidence(self) -> sp.csr_matrix:
+        """
+        Branch-bus incidence matrix A (n_lines x n_buses): +1 at the from bus and -1 at the to bus.
+        """
+        if 'incidence' not in self._cache:
+            arr = self.arrays
+            rows = np.concatenate((np.arange(arr.nline), np.arange(arr.nline)))
+            cols = np.concatenate((arr.f, arr.t))
+            data = np.concatenate((np.ones(arr.nline), -np.ones(arr.nline)))
+            self._cache['incidence'] = sp.csr_matrix((data, (rows, cols)), shape=(arr.nline, arr.nbus))
+        return self._cache['incidence']
+
+    def islands(self) -> np.ndarray:
+        """
+        Connected components of the network graph (buses joined by lines of non-zero series admittance),
+        found in near-linear time and cached until the topology changes.
+        Returns:
+            labels (np.ndarray): Island of each bus, numbered in the order of their first bus.
+        """
+        if 'islands' not in self._cache:
+            arr = self.arrays
+            closed = arr.admittance != 0
+            graph = sp.csr_matrix((np.ones(closed.sum()), (arr.f[closed], arr.t[closed])), shape=(arr.nbus, arr.nbus))
+            _, labels = connected_components(graph, directed=False)
+            # Renumera as ilhas pela ordem da sua primeira barra
+            _, first, labels = np.unique(labels, return_index=True, return_inverse=True)
+            rank = np.empty(len(first), dtype=np.int64)
+            rank[np.argsort(first)] = np.arange(len(first))
+            labels = rank[labels]
+            labels.flags.writeable = False
+            self._cache['islands'] = labels
+        return self._cache['islands']
+
+    def check_connected(self):
+        """
+        Raises a ValueError when the network is split into islands, whose B and Jacobian matrices are singular.
+        Split networks are solved island by island with power_flow_models.solve_islands.
+        """
+        labels = self.islands()
+        n = int(labels.max(initial=0)) + 1
+        if n > 1:
+            names = [self.buses[int(np.flatnonzero(labels == k)[0])].name for k in range(1, min(n, 4))]
+            raise ValueError(f"The network is split into {n} islands (the first buses of the other islands are "
+                             f"{', '.join(names)}{', ...' if n > 4 else ''}). Use solve_islands.")
+
+    def dc_Bf(self) -> sp.csr_matrix:
+        """
+        DC branch matrix Bf = diag(1/x) A, mapping bus angles to line flows.
+        """
+        if 'dc_Bf' not in self._cache:
+            b = -self.dc_arrays.admittance.imag # 1/x, zero for zero impedance lines
+            self._cache['dc_Bf'] = (sp.diags(b) @ self.incidence()).tocsr()
+        return self._cache['dc_Bf']
+
+    def dc_factor(self, ref_bus: Optional[Bus] = None):
+        """
+        Sparse LU factorization of the DC B matrix without the reference bus row and column.
+        Computed once per reference bus and cached until the network topology changes.
+        Args:
+            ref_bus (Bus, optional): The angle reference. Defaults to the slack bus.
+        Returns:
+            keep (np.ndarray): Indices of the non-reference buses, in the order of the factorization.
+            lu (SuperLU): Factorization of the reduced B matrix.
+        """
+        s = self._ref_index(ref_bus)
+        factors = self._cache.setdefault('dc_factor', {})
+        if s not in factors:
+            self.check_connected()
+            keep = np.delete(np.arange(len(self.buses)), s)
+            B = -self.dc_arrays.y_bus().imag
+            factors[s] = (keep, splu(B[keep][:, keep].tocsc()))
+        return factors[s]
+
+    def _ref_index(self, ref_bus: Optional[Bus]) -> int:
         if ref_bus is None:
-            Zbus = self.get_Z_bus()
-        elif z_tie is None:
-            Zbus = self.get_Z_bus(ref_bus)
+            slack = self.arrays.slack_idx
+            if len(slack) == 0:
+                raise ValueError("Nenhuma barra slack encontrada!")
+            return int(slack[0])
+        if ref_bus.id not in self.bus_idx:
+            raise ValueError(f"Bus {ref_bus.id} is not part of the network.")
+        return self.bus_idx[ref_bus.id]
+
+    @staticmethod
+    def _selection(items, index: dict, size: int) -> np.ndarray:
+        """Converts a list of Bus/Line objects or integer indices to an index array (all if None)."""
+        if items is None:
+            return np.arange(size)
+        return np.array([index[item.id] if hasattr(item, 'id') else int(item) for item in items], dtype=np.int64)
+
+    @staticmethod
+    def _allocate(shape, dtype, out: Optional[str]):
+        """Allocates a result matrix in memory, or memory-mapped to an .npy file when out is given."""
+        if out is None:
+            return np.zeros(shape, dtype=dtype)
+        return np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=shape)
+
+    def PTDF(self, lines: Optional[Sequence[Union[Line, int]]] = None, buses: Optional[Sequence[Union[Bus, int]]] = None,
+             ref_bus: Optional[Bus] = None, dtype=np.float64, out: Optional[str] = None, block_size: int = 512) -> np.ndarray:
+        """
+        Power Transfer Distribution Factors of the DC network, PTDF = Bf B^-1.
+        Computed with the branch-bus incidence matrix and the sparse LU of the reduced B matrix,
+        block by block, so only the selected part is ever held in memory.
+        Args:
+            lines (list, optional): Monitored lines (Line objects or indices). All lines if None.
+            buses (list, optional): Injection buses (Bus objects or indices). All buses if None.
+            ref_bus (Bus, optional): Bus that absorbs the injections. Defaults to the slack bus.
+            dtype: Output dtype (e.g. np.float32 to halve memory).
+            out (str, optional): Path of an .npy file to memory-map the output to.
+            block_size (int): Number of right-hand sides solved at once.
+        Returns:
+            PTDF (np.ndarray): Matrix of shape (n_monitored_lines, n_injection_buses).
+        """
+        line_sel = self._selection(lines, self.line_idx, len(self.lines))
+        bus_sel = self._selection(buses, self.bus_idx, len(self.buses))
+        keep, lu = self.dc_factor(ref_bus)
+        Bf = self.dc_Bf()[line_sel][:, keep].tocsr()
+
+        # Position of the selected buses in the reduced system (-1 for the reference bus, whose column is zero)
+        pos = np.full(len(self.buses), -1)
+        pos[keep] = np.arange(len(keep))
+        bus_pos = pos[bus_sel]
+        valid = bus_pos >= 0
+
+        PTDF = self._allocate((len(line_sel), len(bus_sel)), dtype, out)
+        if len(bus_sel) < len(line_sel):
+            # Few injection buses: solve B x = e_k for their columns
+            for start in range(0, len(bus_sel), block_size):
+                cols = np.arange(start, min(start + block_size, len(bus_sel)))
+                cols = cols[valid[cols]]
+                E = np.zeros((len(keep), len(cols)))
+                E[bus_pos[cols], np.arange(len(cols))] = 1
+                PTDF[:, cols] = Bf @ lu.solve(E)
         else:
-            Zbus = self.get_Z_bus_arb_tie(ref_bus, z_tie)
+            # Few monitored lines: solve B^T x = Bf^T for their rows
+            for start in range(0, len(line_sel), block_size):
+                stop = min(start + block_size, len(line_sel))
+                X = lu.solve(Bf[start:stop].T.toarray(), trans='T')
+                block = np.zeros((stop - start, len(bus_sel)))
+                block[:, valid] = X[bus_pos[valid]].T
+                PTDF[start:stop] = block
 
-        CTDF = np.array([line.get_dfactors(Zbus, self.bus_idx) for line in self.lines])
-        return CTDF
+        if out is not None:
+            PTDF.flush()
+        return PTDF
+
+    def LODF(self, lines: Optional[Sequence[Union[Line, int]]] = None, outages: Optional[Sequence[Union[Line, int]]] = None,
+             dtype=np.float64, out: Optional[str] = None, block_size: int = 512) -> np.ndarray:
+        """
+        Line Outage Distribution Factors of the DC network.
+        LODF[l, k] is the change of flow on line l per unit of pre-outage flow on line k when k is removed.
+        Outages that split the network (bridges) get NaN columns. LODF[k, k] = -1.
+        Args:
+            lines (list, optional): Monitored lines (Line objects or indices). All lines if None.
+            outages (list, optional): Outaged lines (Line objects or indices). All lines if None.
+            dtype: Output dtype (e.g. np.float32 to halve memory).
+            out (str, optional): Path of an .npy file to memory-map the output to.
+            block_size (int): Number of outages solved at once.
+        Returns:
+            LODF (np.ndarray): Matrix of shape (n_monitored_lines, n_outages).
+        """
+        mon = self._selection(lines, self.line_idx, len(self.lines))
+        outs = self._selection(outages, self.line_idx, len(self.lines))
+        keep, lu = self.dc_factor()
+        A = self.incidence()[:, keep].tocsr()
+        Bf = self.dc_Bf()[:, keep].tocsr()
+        Bf_mon = Bf[mon]
+
+        LODF = self._allocate((len(mon), len(outs)), dtype, out)
+        for start in range(0, len(outs), block_size):
+            block = outs[start:start + block_size]
+            # Flow on every line per unit of transfer between the ends of each outaged line
+            X = lu.solve(A[block].T.toarray())
+            H = Bf_mon @ X
+            H_kk = np.asarray(Bf[block].multiply(X.T).sum(axis=1)).ravel()
+            den = 1 - H_kk
+            bridge = np.abs(den) < 1e-10
+            den[bridge] = np.nan
+            result = H / den
+            result[mon[:, None] == block[None, :]] = -1
+            LODF[:, start:start + len(block)] = result
+
+        if out is not None:
+            LODF.flush()
+        return LODF
 
     def ACtoDC(self):
         """
         Converts the AC network to a DC network in place, by removing line resistance and shunt elements.
+        The solvers use the non-mutating dc_arrays view instead.
         """
         for branch in self.lines:
             branch.r = 0
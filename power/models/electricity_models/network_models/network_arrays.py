@@ -0,0 +1,257 @@
+from __future__ import annotations
+import hashlib
+import numpy as np
+import scipy.sparse as sp
+from dataclasses import dataclass, fields, replace
+from functools import cached_property
+from typing import List, TYPE_CHECKING
+from power.models.utils import FrozenArrays
+
+if TYPE_CHECKING:
+    from power.models.electricity_models.network_models.network import Network
+
+# Bus type codes used in NetworkArrays.bus_type
+PQ = 1
+PV = 2
+SLACK = 3
+BUS_TYPE_CODES = {'PQ': PQ, 'PV': PV, 'Slack': SLACK}
+
+
+def stable_hash(*parts) -> str:
+    """
+    SHA-256 of nested arrays, lists/tuples and scalars, stable across processes and sessions
+    (unlike hash()). Arrays are hashed by dtype, shape and raw bytes.
+    """
+    h = hashlib.sha256()
+
+    def feed(x):
+        if isinstance(x, np.ndarray):
+            h.update(f'a{x.dtype.str}{x.shape}'.encode())
+            h.update(np.ascontiguousarray(x).tobytes())
+        elif isinstance(x, (list, tuple)):
+            h.update(f'l{len(x)}'.encode())
+            for y in x:
+                feed(y)
+        else:
+            s = repr(x).encode()
+            h.update(f's{len(s)}'.encode())
+            h.update(s)
+
+    for part in parts:
+        feed(part)
+    return h.hexdigest()
+
+
+@dataclass(frozen=True)
+class NetworkArrays(FrozenArrays):
+    """
+    Struct-of-arrays view of a Network, already converted to per-unit.
+    Built by Network.arrays and rebuilt only when the network changes. The arrays are shared through
+    the network cache, so they are read-only.
+    Angles are in radians. Indices refer to positions in network.buses.
+    """
+    # Buses
+    bus_names: List[str]
+    bus_type: np.ndarray # PQ, PV or SLACK codes
+    v: np.ndarray
+    theta: np.ndarray
+    p: np.ndarray # Net active injection (generation - load)
+    q: np.ndarray # Net reactive injection (generation - load)
+    shunt: np.ndarray # Complex shunt admittance
+
+    # Lines
+    line_names: List[str]
+    f: np.ndarray # From bus index
+    t: np.ndarray # To bus index
+    r: np.ndarray
+    x: np.ndarray
+    b_half: np.ndarray
+    tap_ratio: np.ndarray
+    tap_phase: np.ndarray
+    flow_max: np.ndarray
+
+    # Generators
+    gen_names: List[str]
+    gen_bus: np.ndarray
+    gen_p: np.ndarray
+    gen_q: np.ndarray
+    gen_p_min: np.ndarray
+    gen_p_max: np.ndarray
+    gen_q_min: np.ndarray
+    gen_q_max: np.ndarray
+    gen_cost_a: np.ndarray
+    gen_cost_b: np.ndarray
+    gen_cost_c: np.ndarray
+    gen_ramp: np.ndarray
+
+    # Loads
+    load_names: List[str]
+    load_bus: np.ndarray
+    load_p: np.ndarray
+    load_q: np.ndarray
+
+    # Fields that define the structure of the network (element names, bus types and connections)
+    STRUCTURE = ('bus_names', 'bus_type', 'line_names', 'f', 't', 'gen_names', 'gen_bus', 'load_names', 'load_bus')
+
+    @property
+    def nbus(self) -> int:
+        return len(self.bus_type)
+
+    @property
+    def nline(self) -> int:
+        return len(self.f)
+
+    @property
+    def pq_idx(self) -> np.ndarray:
+        return np.flatnonzero(self.bus_type == PQ)
+
+    @property
+    def pv_idx(self) -> np.ndarray:
+        return np.flatnonzero(self.bus_type == PV)
+
+    @property
+    def slack_idx(self) -> np.ndarray:
+        return np.flatnonzero(self.bus_type == SLACK)
+
+    @property
+    def admittance(self) -> np.ndarray:
+        """Series admittance of each line (pu), zero for zero impedance lines."""
+        z = self.r + 1j * self.x
+        y = np.zeros(self.nline, dtype=complex)
+        np.divide(1, z, out=y, where=z != 0)
+        return y
+
+    @cached_property
+    def dc(self) -> "NetworkArrays":
+        """
+        Read-only DC projection of these arrays: no line resistance, no line charging,
+        no taps and no shunts outside the slack bus. The source network is not modified.
+        """
+        return replace(
+            self,
+            r=np.zeros(self.nline),
+            b_half=np.zeros(self.nline),
+            tap_ratio=np.ones(self.nline),
+            tap_phase=np.zeros(self.nline),
+            shunt=np.where(self.bus_type == SLACK, self.shunt, 0),
+        )
+
+    def digest(self, names=None) -> str:
+        """
+        Stable hash of the given fields (all fields by default), e.g. digest(NetworkArrays.STRUCTURE)
+        for a hash of the topology only. The full hash is computed once per instance.
+        """
+        if names is None:
+            if '_digest' not in self.__dict__:
+                object.__setattr__(self, '_digest', self.digest([f.name for f in fields(self)]))
+            return self.__dict__['_digest']
+        return stable_hash([(name, getattr(self, name)) for name in names])
+
+    def data_vector(self) -> np.ndarray:
+        """All numeric data outside STRUCTURE as one real vector, to measure how close two networks are."""
+        values = [np.asarray(getattr(self, f.name)) for f in fields(self)
+                  if f.name not in self.STRUCTURE and not f.name.endswith('_names')]
+        values = [np.concatenate((v.real, v.imag)) if np.iscomplexobj(v) else v for v in values]
+        return np.concatenate([v.astype(float).ravel() for v in values])
+
+    def branch_admittances(self, resistance: bool = True, charging: bool = True,
+                           tap_ratio: bool = True, tap_phase: bool = True):
+        """
+        Returns the two-port admittance elements of every line.
+        The flags allow dropping line resistance, line charging, tap ratios or
+        phase shifts, as needed by the fast decoupled B matrices.
+        Returns:
+            f, t (np.ndarray): From and to bus indices of each line.
+            Yff, Yft, Ytf, Ytt (np.ndarray): Admittance elements of each line (pu).
+        """
+        r = self.r if resistance else np.zeros(self.nline)
+        z = r + 1j * self.x
+        y = np.zeros(self.nline, dtype=complex)
+        np.divide(1, z, out=y, where=z != 0)
+        b = 1j * self.b_half if charging else np.zeros(self.nline)
+        a = (self.tap_ratio if tap_ratio else 1.0) * np.exp(1j * (self.tap_phase if tap_phase else 0.0))
+
+        Yff = y / (a * np.conj(a)) + b
+        Yft = -y / np.conj(a)
+        Ytf = -y / a
+        Ytt = y + b
+        return self.f, self.t, Yff, Yft, Ytf, Ytt
+
+    def y_bus(self, shunts: bool = True, **branch_options) -> sp.csr_matrix:
+        """
+        Assembles the sparse Y bus in one vectorized pass.
+        Args:
+            shunts (bool): Whether to include the bus shunts.
+            branch_options: Flags forwarded to branch_admittances.
+        """
+        n = self.nbus
+        f, t, Yff, Yft, Ytf, Ytt = self.branch_admittances(**branch_options)
+        shunt = self.shunt if shunts else np.zeros(n)
+
+        diag = np.arange(n)
+        rows = np.concatenate((f, f, t, t, diag))
+        cols = np.concatenate((f, t, f, t, diag))
+        data = np.concatenate((Yff, Yft, Ytf, Ytt, shunt))
+        ybus = sp.coo_matrix((data, (rows, cols)), shape=(n, n)).tocsr() # Duplicates are summed
+        ybus.sort_indices()
+        return ybus
+
+    @classmethod
+    def from_network(cls, network: "Network") -> "NetworkArrays":
+        """
+        Collects the per-unit data of every bus, line, generator and load of the network.
+        """
+        bus_idx = network.bus_idx
+        buses, lines, gens, loads = network.buses, network.lines, network.generators, network.loads
+        nb, nl, ng, nd = len(buses), len(lines), len(gens), len(loads)
+
+        def column(objs, attr, dtype=float):
+            return np.fromiter((getattr(o, attr) for o in objs), dtype=dtype, count=len(objs))
+
+        def limit(objs, attr, default):
+            return np.fromiter((default if getattr(o, attr) is None else getattr(o, attr) for o in objs),
+                               dtype=float, count=len(objs))
+
+        bus_type = np.fromiter((BUS_TYPE_CODES[b.bus_type] for b in buses), dtype=np.int8, count=nb)
+        gen_bus = np.fromiter((bus_idx[g.bus.id] for g in gens), dtype=np.int64, count=ng)
+        load_bus = np.fromiter((bus_idx[l.bus.id] for l in loads), dtype=np.int64, count=nd)
+        gen_p, gen_q = column(gens, 'p'), column(gens, 'q')
+        load_p, load_q = column(loads, 'p'), column(loads, 'q')
+
+        return cls(
+            bus_names=[b.name for b in buses],
+            bus_type=bus_type,
+            v=column(buses, 'v'),
+            theta=column(buses, 'theta_rad'),
+            p=np.bincount(gen_bus, gen_p, nb) - np.bincount(load_bus, load_p, nb),
+            q=np.bincount(gen_bus, gen_q, nb) - np.bincount(load_bus, load_q, nb),
+            shunt=column(buses, 'shunt', complex),
+
+            line_names=[ln.name for ln in lines],
+            f=np.fromiter((bus_idx[ln.from_bus.id] for ln in lines), dtype=np.int64, count=nl),
+            t=np.fromiter((bus_idx[ln.to_bus.id] for ln in lines), dtype=np.int64, count=nl),
+            r=column(lines, 'resistance'),
+            x=column(lines, 'reactance'),
+            b_half=column(lines, 'shunt_admittance_half'),
+            tap_ratio=column(lines, 'tap_ratio'),
+            tap_phase=column(lines, 'tap_phase_rad'),
+            flow_max=column(lines, 'flow_max_pu'),
+
+            gen_names=[g.name for g in gens],
+            gen_bus=gen_bus,
+            gen_p=gen_p,
+            gen_q=gen_q,
+            gen_p_min=column(gens, 'p_min'),
+            gen_p_max=column(gens, 'p_max'),
+            gen_q_min=limit(gens, 'q_min', -np.inf),
+            gen_q_max=limit(gens, 'q_max', np.inf),
+            gen_cost_a=column(gens, 'cost_a'),
+            gen_cost_b=column(gens, 'cost_b'),
+            gen_cost_c=column(gens, 'cost_c'),
+            gen_ramp=column(gens, 'ramp'),
+
+            load_names=[l.name for l in loads],
+            load_bus=load_bus,
+            load_p=load_p,
+            load_q=load_q,
+        )
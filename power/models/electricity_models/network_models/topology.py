@@ -0,0 +1,103 @@
+from __future__ import annotations
+import copy
+import numpy as np
+from dataclasses import dataclass
+from typing import List, TYPE_CHECKING
+
+from power.models.electricity_models.network_models.network_arrays import SLACK
+from power.models.utils import FrozenArrays
+
+if TYPE_CHECKING:
+    from power.models.electricity_models.network_models.network import Network
+
+
+@dataclass(frozen=True)
+class Island(FrozenArrays):
+    """
+    Connected part of a network (see Network.islands). Indices refer to positions in the lists of the network.
+    """
+    index: int
+    buses: np.ndarray
+    lines: np.ndarray
+    generators: np.ndarray
+    loads: np.ndarray
+    slack: int # Barra slack da ilha, -1 se a ilha não tem geração (desenergizada)
+    assigned: bool # Se a slack foi escolhida pelo processador (a ilha não tinha uma)
+
+    @property
+    def energized(self) -> bool:
+        return self.slack >= 0
+
+    def __len__(self) -> int:
+        return len(self.buses)
+
+
+def find_islands(network: Network) -> List[Island]:
+    """
+    Splits the network into its islands and validates or assigns the slack bus of each one.
+    An island keeps its own slack bus; one without a slack gets the bus with the largest generation
+    capacity (sum of p_max, then of p) and one without generators is left de-energized (slack -1).
+    Args:
+        network (Network): The network.
+    Returns:
+        list of Island: The islands, in the order of their first bus.
+    Raises:
+        ValueError: If an island has more than one slack bus.
+    """
+    arr = network.arrays
+    labels = network.islands()
+    n = int(labels.max(initial=-1)) + 1
+    capacity = np.bincount(arr.gen_bus, arr.gen_p_max, arr.nbus)
+    generation = np.bincount(arr.gen_bus, arr.gen_p, arr.nbus)
+    has_generator = np.bincount(arr.gen_bus, minlength=arr.nbus) > 0
+
+    # Elementos de cada ilha, agrupados com uma única ordenação estável
+    def members(bus_of, index=None):
+        index = np.arange(len(bus_of)) if index is None else index
+        island = labels[bus_of[index]]
+        order = np.argsort(island, kind='stable')
+        return np.split(index[order], np.searchsorted(island[order], np.arange(1, n)))
+
+    buses = members(np.arange(arr.nbus))
+    # Linhas de impedância nula entre ilhas não pertencem a nenhuma delas
+    lines = members(arr.f, np.flatnonzero(labels[arr.f] == labels[arr.t]))
+    generators = members(arr.gen_bus)
+    loads = members(arr.load_bus)
+
+    islands = []
+    for k in range(n):
+        slacks = buses[k][arr.bus_type[buses[k]] == SLACK]
+        if len(slacks) > 1:
+            names = ', '.join(arr.bus_names[i] for i in slacks)
+            raise ValueError(f"Island {k} has {len(slacks)} slack buses ({names}).")
+        assigned = len(slacks) == 0
+        if not assigned:
+            slack = int(slacks[0])
+        else:
+            candidates = buses[k][has_generator[buses[k]]]
+            if len(candidates) == 0:
+                slack = -1
+            else:
+                slack = int(candidates[np.lexsort((-generation[candidates], -capacity[candidates]))[0]])
+        islands.append(Island(index=k, buses=buses[k], lines=lines[k], generators=generators[k], loads=loads[k],
+                              slack=slack, assigned=assigned and slack >= 0))
+    return islands
+
+
+def island_network(network: Network, island: Island) -> Network:
+    """
+    Independent copy of one island as a network of its own, with the slack bus chosen by find_islands.
+    The buses, lines, generators and loads are copied, so the original network is not modified.
+    """
+    from power.models.electricity_models.network_models.network import Network
+
+    name = f"{network.name} (island {island.index})" if network.name else f"Island {island.index}"
+    sub = Network(name=name)
+    elements = ([network.buses[i] for i in island.buses], [network.lines[i] for i in island.lines],
+                [network.loads[i] for i in island.loads], [network.generators[i] for i in island.generators])
+    # As referências à rede original apontam para a nova rede e as referências entre elementos são preservadas
+    buses, lines, loads, generators = copy.deepcopy(elements, {id(network): sub})
+    sub.buses, sub.lines, sub.loads, sub.generators = buses, lines, loads, generators
+    if island.assigned:
+        buses[int(np.flatnonzero(island.buses == island.slack)[0])].bus_type = 'Slack'
+    return sub
@@ -0,0 +1,138 @@
+from __future__ import annotations
+import numpy as np
+from scipy.sparse.linalg import splu
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from power.models.electricity_models.bus_models.bus import Bus
+    from power.models.electricity_models.network_models.network import Network
+
+
+class ZBus:
+    """
+    On-demand access to the Z bus matrix (inverse of the Y bus) of a network.
+    Columns and rows are computed from a sparse LU factorization of the Y bus, only when requested,
+    and cached. The ground referenced factorization and columns are shared through the network cache,
+    so several accessors (e.g. with different reference buses) reuse the same solves.
+    """
+    def __init__(self, network: "Network", ref_bus: Optional["Bus"] = None, z_tie: Optional[complex] = None, block_size: int = 512):
+        """
+        Args:
+            network (Network): The network.
+            ref_bus (Bus, optional): The bus to reference the Z bus to. If None, the Z bus is ground referenced.
+            z_tie (complex, optional): Impedance of a tie line between ref_bus and ground.
+                If given, the tie line variant is used instead of the reference bus one.
+            block_size (int): Number of columns solved at once when many are requested.
+        """
+        if z_tie is not None and ref_bus is None:
+            raise ValueError("A reference bus is required for the Z bus with tie line.")
+        self.network = network
+        self.n = len(network.buses)
+        self.s = None if ref_bus is None else network._ref_index(ref_bus)
+        self.z_tie = z_tie
+        self.block_size = block_size
+        self._columns = {}
+        self._rows = {}
+
+        if z_tie is not None:
+            self.denom = self._base_columns([self.s])[self.s, 0] + z_tie
+            if self.denom == 0:
+                raise ValueError("The denominator for the Z bus with tie line is zero, check the impedance values.")
+
+    @property
+    def _base(self) -> dict:
+        """Ground referenced factorization and cached columns/rows, stored in the network cache."""
+        cache = self.network._cache
+        if 'z_bus' not in cache:
+            cache['z_bus'] = {'lu': splu(self.network.y_bus().tocsc()), 'columns': {}, 'rows': {}}
+        return cache['z_bus']
+
+    def _base_solve(self, idx, trans: bool) -> np.ndarray:
+        """Columns (trans=False) or rows (trans=True) of the ground referenced Z bus, as columns of a matrix."""
+        base = self._base
+        store = base['rows'] if trans else base['columns']
+        missing = [k for k in dict.fromkeys(idx) if k not in store]
+        for start in range(0, len(missing), self.block_size):
+            block = missing[start:start + self.block_size]
+            E = np.zeros((self.n, len(block)), dtype=complex)
+            E[block, np.arange(len(block))] = 1
+            X = base['lu'].solve(E, trans='T' if trans else 'N')
+            for c, k in enumerate(block):
+                store[k] = X[:, c]
+        if len(idx) == 0:
+            return np.zeros((self.n, 0), dtype=complex)
+        return np.column_stack([store[k] for k in idx])
+
+    def _base_columns(self, idx) -> np.ndarray:
+        return self._base_solve(idx, trans=False)
+
+    def _base_rows(self, idx) -> np.ndarray:
+        return self._base_solve(idx, trans=True).T
+
+    def _index(self, buses) -> list:
+        if buses is None:
+            return list(range(self.n))
+        bus_idx = self.network.bus_idx
+        return [bus_idx[b.id] if hasattr(b, 'id') else int(b) for b in buses]
+
+    def columns(self, buses=None) -> np.ndarray:
+        """
+        Returns the Z bus columns of the given buses (Bus objects or indices), shape (n, k).
+        """
+        idx = self._index(buses)
+        missing = [k for k in dict.fromkeys(idx) if k not in self._columns]
+        if missing:
+            C = self._base_columns(missing)
+            if self.s is not None:
+                s = self.s
+                Zs_col = self._base_columns([s])[:, 0]
+                Zs_row = self._base_rows([s])[0, missing]
+                if self.z_tie is None:
+                    C = C - Zs_col[:, None] - Zs_row[None, :] + Zs_col[s]
+                else:
+                    C = C - np.outer(Zs_col, Zs_row) / self.denom
+            for c, k in enumerate(missing):
+                self._columns[k] = C[:, c]
+        if len(idx) == 0:
+            return np.zeros((self.n, 0), dtype=complex)
+        return np.column_stack([self._columns[k] for k in idx])
+
+    def rows(self, buses=None) -> np.ndarray:
+        """
+        Returns the Z bus rows of the given buses (Bus objects or indices), shape (k, n).
+        """
+        idx = self._index(buses)
+        missing = [k for k in dict.fromkeys(idx) if k not in self._rows]
+        if missing:
+            R = self._base_rows(missing)
+            if self.s is not None:
+                s = self.s
+                Zs_row = self._base_rows([s])[0]
+                Zs_col = self._base_columns([s])[missing, 0]
+                if self.z_tie is None:
+                    R = R - Zs_col[:, None] - Zs_row[None, :] + Zs_row[s]
+                else:
+                    R = R - np.outer(Zs_col, Zs_row) / self.denom
+            for r, k in enumerate(missing):
+                self._rows[k] = R[r]
+        if len(idx) == 0:
+            return np.zeros((0, self.n), dtype=complex)
+        return np.vstack([self._rows[k] for k in idx])
+
+    def column(self, bus) -> np.ndarray:
+        return self.columns([bus])[:, 0]
+
+    def row(self, bus) -> np.ndarray:
+        return self.rows([bus])[0]
+
+    def entry(self, i, j) -> complex:
+        """Returns Z[i, j]."""
+        return self.columns([j])[self._index([i])[0], 0]
+
+    def submatrix(self, rows=None, cols=None) -> np.ndarray:
+        """Returns Z[rows, cols], computing only the requested columns."""
+        return self.columns(cols)[self._index(rows)]
+
+    def toarray(self) -> np.ndarray:
+        """Returns the full dense Z bus (computes every column)."""
+        return self.columns()
@@ -1,5 +1,9 @@
 import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve, splu
 from power.models.electricity_models.network_models import *
+from power.models.electricity_models.network_models.network_arrays import NetworkArrays
+from power.models.solve_cache import SolveCache
 
 class AC_PF:
     def __init__(self, network: Network):
@@ -7,35 +11,39 @@ class AC_PF:
         Initializes the AC Power Flow class.
         """
         self.network = network # Network object
+        self.network.check_connected()
 
-        # YBUS
+        # YBUS (sparse)
+        self.Ybus = self.network.y_bus() # YBUS
         self.G = self.network.get_G() # Real part of YBUS
         self.B = self.network.get_B() # Imaginary part of YBUS
 
+        # Per-unit network data
+        self.arrays = arr = self.network.arrays
+
         # Number of buses
-        self.nbus = len(self.network.buses)
+        self.nbus = arr.nbus
 
         #Organize bus types:
-        self.pq_buses = [bus for bus in self.network.buses if bus.bus_type == 'PQ'] # PQ buses
-        self.pv_buses = [bus for bus in self.network.buses if bus.bus_type == 'PV'] # PV buses
-        self.slack_bus = [bus for bus in self.network.buses if bus.bus_type == 'Slack'] # Slack bus
+        self.pq_buses = [self.network.buses[i] for i in arr.pq_idx] # PQ buses
+        self.pv_buses = [self.network.buses[i] for i in arr.pv_idx] # PV buses
+        self.slack_bus = [self.network.buses[i] for i in arr.slack_idx] # Slack bus
 
         # Bus Maps:
-        self.bus_idx = {bus.id: i for i, bus in enumerate(self.network.buses)} # Bus Map, key: bus id, value: bus index
-        self.pq_idx = [self.bus_idx[bus.id] for bus in self.pq_buses] # PQ buses
-        self.pv_idx = [self.bus_idx[bus.id] for bus in self.pv_buses] # PV buses
-        self.slack_idx = [self.bus_idx[bus.id] for bus in self.slack_bus] # Slack bus
-        self.K = self.get_K_set() # K set: Set of buses connected to each bus including itself
-        self.omega = self.get_omega_set() # Omega set: Set of buses connected to each bus excluding itself
+        self.bus_idx = self.network.bus_idx # Bus Map, key: bus id, value: bus index
+        self.pq_idx = arr.pq_idx # PQ buses
+        self.pv_idx = arr.pv_idx # PV buses
+        self.slack_idx = arr.slack_idx # Slack bus
+        self.pvpq_idx = np.sort(np.concatenate((self.pv_idx, self.pq_idx))) # Buses with unknown angle
 
         # Initialize voltage angles and magnitudes
-        self.theta_0 = np.array([bus.theta_rad for bus in self.network.buses]) # Voltage angles
-        self.V_0 = np.array([bus.v for bus in self.network.buses]) # Voltage magnitudes
+        self.theta_0 = arr.theta.copy() # Voltage angles
+        self.V_0 = arr.v.copy() # Voltage magnitudes
         self.X_0 = np.concatenate((self.theta_0, self.V_0)) # State vector
 
         # Initialize P and Q
-        self.P_esp = np.array([bus.p for bus in self.network.buses]) # Active power
-        self.Q_esp = np.array([bus.q for bus in self.network.buses]) # Reactive power
+        self.P_esp = arr.p.copy() # Active power
+        self.Q_esp = arr.q.copy() # Reactive power
         self.PQ_esp = np.concatenate((self.P_esp, self.Q_esp)) # Power vector
 
         # Initialize the final calculated vectors
@@ -43,61 +51,17 @@ class AC_PF:
         self.V = np.ones(self.nbus) # Voltage magnitudes
         self.P = np.zeros(self.nbus)
         self.Q = np.zeros(self.nbus)
+        self.converged = False # Se a última solução atingiu as tolerâncias
 
     
-    def get_K_set(self):
-        """
-        Returns the K set, which is the set of buses connected to each bus.
-        """
-        K_set = {}
-        for bus in self.network.buses:
-            i = self.bus_idx[bus.id]
-            connected_indices = {i}    #include the bus itself
-
-            for line in self.network.lines:
-                if line.from_bus.id == bus.id:
-                    connected_indices.add(self.bus_idx[line.to_bus.id])
-                elif line.to_bus.id == bus.id:
-                    connected_indices.add(self.bus_idx[line.from_bus.id])
-            K_set[i] = connected_indices
-        return K_set
-
-    def get_omega_set(self):
-        """
-        Returns the omega set, which is the set of buses connected to each bus, excluding itself.
-        """
-        omega_set = {}
-        for bus in self.network.buses:
-            i = self.bus_idx[bus.id]
-            connected_indices = set()
-
-            for line in self.network.lines:
-                if line.from_bus.id == bus.id:
-                    connected_indices.add(self.bus_idx[line.to_bus.id])
-                elif line.to_bus.id == bus.id:
-                    connected_indices.add(self.bus_idx[line.from_bus.id])
-            omega_set[i] = connected_indices
-        
-        return omega_set
-
     # Method for power equations: It receives current V and theta for all buses and returns calculated P's and Q's.
     def pq_calc(self, theta, V):
-        P = np.zeros(self.nbus)
-        Q = np.zeros(self.nbus)
-        for i in range(self.nbus):
-            Vi = V[i]
-            theta_i = theta[i]
-            for j in self.K[i]:
-                V_j = V[j]
-                sin_diff = np.sin(theta_i - theta[j])
-                cos_diff = np.cos(theta_i - theta[j])
-                Gij = self.G[i, j]
-                Bij = self.B[i, j]
-                Vj = V[j]
-
-                P[i] += Vi * Vj * (Gij * cos_diff + Bij * sin_diff)
-                Q[i] += Vi * Vj * (Gij * sin_diff - Bij * cos_diff)
-        return P, Q
+        """
+        Computes the bus injections S = V * conj(Ybus @ V).
+        """
+        Vc = V * np.exp(1j * theta)
+        S = Vc * np.conj(self.Ybus @ Vc)
+        return S.real, S.imag
 
     # Method for Power Mismatch:
     def power_mismatch(self, P, Q):
@@ -105,74 +69,188 @@ class AC_PF:
         dQ = self.Q_esp - Q
 
         # Set the mismatch to zero for slack bus:
-        for i in self.slack_idx:
-            dP[i] = 0
-            dQ[i] = 0
+        dP[self.slack_idx] = 0
+        dQ[self.slack_idx] = 0
 
         # Set the Q mismatch to zero for PV buses:
-        for i in self.pv_idx:
-            dQ[i] = 0
+        dQ[self.pv_idx] = 0
         return dP, dQ
 
+    def dS_dV(self, theta, V):
+        """
+        Sparse partial derivatives of the bus injections.
+        Returns:
+            dS_dtheta (sp.csr_matrix): dS/dtheta.
+            dS_dV (sp.csr_matrix): dS/d|V|.
+        """
+        Ybus = self.Ybus
+        Vc = V * np.exp(1j * theta)
+        Ibus = Ybus @ Vc
+        diagV = sp.diags(Vc)
+        diagI = sp.diags(Ibus)
+        diagVnorm = sp.diags(Vc / V)
+
+        dS_dV = diagV @ (Ybus @ diagVnorm).conj() + diagI.conj() @ diagVnorm
+        dS_dtheta = 1j * diagV @ (diagI - Ybus @ diagV).conj()
+        return dS_dtheta.tocsr(), dS_dV.tocsr()
 
     def jacobian(self, theta, V, P, Q):
+        """
+        Sparse Jacobian of the full 2N x 2N system.
+        Slack rows (P and Q) and PV rows (Q) are replaced by identity rows.
+        P and Q are kept for compatibility, the derivatives are computed from theta and V.
+        """
         n = self.nbus
-        G = self.G
-        B = self.B
-        H = np.zeros((n, n)) # dP/dtheta
-        N = np.zeros((n, n)) # dP/dV
-        M = np.zeros((n, n)) # dQ/dtheta
-        L = np.zeros((n, n)) # dQ/dV
-
-        for i in range(n):
-            V_i = V[i]
-            theta_i = theta[i]
-            B_ii = B[i, i]
-            G_ii = G[i, i]
-            P_i = P[i]
-            Q_i = Q[i]
-            for j in self.omega[i]:
-                V_j = V[j]
-                sin_diff = np.sin(theta_i - theta[j])
-                cos_diff = np.cos(theta_i - theta[j])
-                Gij = G[i, j]
-                Bij = B[i, j]
-
-                H[i, j] =  V_i * V_j * (Gij * sin_diff - Bij * cos_diff)
-                N[i, j] = V_i * (Gij * cos_diff + Bij * sin_diff)
-                M[i, j] = -V_i * V_j * (Gij * cos_diff + Bij * sin_diff)
-                L[i, j] = V_i * (Gij * sin_diff - Bij * cos_diff)
-
-            # Set the diagonal elements of H, N, M, and L
-            H[i, i] = -V_i ** 2 * B_ii - Q_i
-            N[i, i] = (P_i + V_i ** 2 * G_ii) / V_i
-            M[i, i] = P_i - V_i ** 2 * G_ii
-            L[i, i] = (Q_i - V_i ** 2 * B_ii) / V_i
-            
-        J = np.block([[H, N], [M, L]])
-
-        for i in self.slack_idx:
-            J[i, :] = 0   # P row equation set to zero
-            J[i, i] = 1   # excpect the diagonal element, which is 1
-
-            J[n + i, :] = 0 # Q row equation set to zero
-            J[n + i, n + i] = 1 # except the diagonal element, which is 1
-        
-        for i in self.pv_idx:
-            J[n + i, :] = 0 # Q row equation set to zero
-            J[n + i, n + i] = 1 # except the diagonal element, which is 1
-        
-        return J
-
-    def solve(self, tol_P = 1e-6, tol_Q = 1e-6, max_iter = 100, verbose = False):
+        dS_dtheta, dS_dV = self.dS_dV(theta, V)
+
+        H = dS_dtheta.real # dP/dtheta
+        N = dS_dV.real # dP/dV
+        M = dS_dtheta.imag # dQ/dtheta
+        L = dS_dV.imag # dQ/dV
+
+        J = sp.bmat([[H, N], [M, L]], format='csr')
+
+        fixed = np.zeros(2 * n, dtype=bool)
+        fixed[self.slack_idx] = True # P row equation of the slack
+        fixed[n + self.slack_idx] = True # Q row equation of the slack
+        fixed[n + self.pv_idx] = True # Q row equation of PV buses
+
+        # Zero the fixed rows except the diagonal element, which is 1
+        J = sp.diags((~fixed).astype(float)) @ J + sp.diags(fixed.astype(float))
+        return J.tocsr()
+
+    def reduced_jacobian(self, theta, V):
+        """
+        Sparse Jacobian of the reduced system: P equations of PV and PQ buses
+        and Q equations of PQ buses, with respect to their unknown angles and voltages.
+        """
+        pvpq = self.pvpq_idx
+        pq = self.pq_idx
+        dS_dtheta, dS_dV = self.dS_dV(theta, V)
+
+        dS_dtheta_pvpq = dS_dtheta[:, pvpq]
+        dS_dV_pq = dS_dV[:, pq]
+
+        H = dS_dtheta_pvpq[pvpq].real # dP/dtheta
+        N = dS_dV_pq[pvpq].real # dP/dV
+        M = dS_dtheta_pvpq[pq].imag # dQ/dtheta
+        L = dS_dV_pq[pq].imag # dQ/dV
+        return sp.bmat([[H, N], [M, L]], format='csc')
+
+    def reduced_ordering(self, J):
+        """
+        Column ordering for the sparse LU of the reduced Jacobian.
+        The ordering only depends on the sparsity pattern, so it is computed once per topology
+        and bus type set and kept in the network cache, to be reused by every iteration and solve.
+        """
+        orderings = self.network._cache.setdefault('newton_ordering', {})
+        key = (self.pvpq_idx.tobytes(), self.pq_idx.tobytes())
+        if key not in orderings:
+            lu = splu(J, permc_spec='COLAMD')
+            orderings[key] = np.argsort(lu.perm_c)
+        return orderings[key]
+
+    def reduced_step(self, theta, V, dP, dQ):
+        """
+        Newton step from the reduced system, solved with a sparse LU that reuses the stored ordering.
+        Returns:
+            dtheta, dV (np.ndarray): Updates for all buses (zero for the known values).
+        """
+        pvpq = self.pvpq_idx
+        pq = self.pq_idx
+        J = self.reduced_jacobian(theta, V)
+        order = self.reduced_ordering(J)
+
+        rhs = np.concatenate((dP[pvpq], dQ[pq]))
+        lu = splu(J[:, order], permc_spec='NATURAL')
+        dx = np.empty_like(rhs)
+        dx[order] = lu.solve(rhs)
+
+        dtheta = np.zeros(self.nbus)
+        dV = np.zeros(self.nbus)
+        dtheta[pvpq] = dx[:len(pvpq)]
+        dV[pq] = dx[len(pvpq):]
+        return dtheta, dV
+
+    def decoupled_factors(self, method='fdxb'):
+        """
+        Sparse LU factors of the fast decoupled B' (PV+PQ angles) and B'' (PQ voltages) matrices.
+        Both are built from the line parameters, factorized once per topology and kept
+        in the network cache, to be reused by every iteration and solve.
+        Args:
+            method (str): 'fdxb' drops line resistance in B', 'fdbx' drops it in B''.
+        """
+        factors = self.network._cache.setdefault('decoupled_factors', {})
+        key = (method, self.pvpq_idx.tobytes(), self.pq_idx.tobytes())
+        if key not in factors:
+            arr = self.network.arrays
+            # B': no shunts, no line charging and no tap ratios
+            Bp = -arr.y_bus(shunts=False, charging=False, tap_ratio=False, resistance=(method == 'fdbx')).imag
+            # B'': no phase shifters
+            Bpp = -arr.y_bus(tap_phase=False, resistance=(method == 'fdxb')).imag
+
+            Bp = Bp[self.pvpq_idx][:, self.pvpq_idx].tocsc()
+            Bpp = Bpp[self.pq_idx][:, self.pq_idx].tocsc()
+            factors[key] = (splu(Bp), splu(Bpp))
+        return factors[key]
+
+    def decoupled_step(self, theta, V, dP, method='fdxb'):
+        """
+        One fast decoupled iteration: a P-theta half iteration followed by a Q-V half iteration.
+        Returns:
+            dtheta, dV (np.ndarray): Updates for all buses (zero for the known values).
+        """
+        lu_p, lu_pp = self.decoupled_factors(method)
+        pvpq = self.pvpq_idx
+        pq = self.pq_idx
+
+        dtheta = np.zeros(self.nbus)
+        dtheta[pvpq] = lu_p.solve(dP[pvpq] / V[pvpq])
+
+        P, Q = self.pq_calc(theta + dtheta, V)
+        _, dQ = self.power_mismatch(P, Q)
+
+        dV = np.zeros(self.nbus)
+        dV[pq] = lu_pp.solve(dQ[pq] / V[pq])
+        return dtheta, dV
+
+    def solve(self, tol_P = 1e-6, tol_Q = 1e-6, max_iter = 100, verbose = False, method = 'full', cache = None):
         """
-        Solves the power flow problem using the Newton-Raphson method.
-        If verbose is True, prints detailed iteration information.
+        Solves the power flow problem using the Newton-Raphson or the fast decoupled method.
+        If verbose is True, prints detailed iteration information and whether it converged;
+        the outcome is always kept in self.converged.
+        Args:
+            method (str): 'full' solves the full 2N system with identity rows for slack and PV equations,
+                'reduced' solves only the PV+PQ angle and PQ voltage equations with a sparse LU,
+                'fdxb' and 'fdbx' use the fast decoupled XB and BX versions with constant B matrices.
+            cache (SolveCache, optional): Returns a cached solution of the same case when there is one,
+                otherwise starts from the closest cached solution and stores the new one.
         """
+        if method not in ('full', 'reduced', 'fdxb', 'fdbx'):
+            raise ValueError(f"Unknown method '{method}'. Use 'full', 'reduced', 'fdxb' or 'fdbx'.")
+
         V = self.V_0
         theta = self.theta_0
+
+        if cache is not None:
+            arr = self.arrays
+            structure = ('AC_PF', method, tol_P, tol_Q, max_iter, arr.digest(NetworkArrays.STRUCTURE))
+            keys = SolveCache.keys(structure, [arr.data_vector()])
+            entry = cache.get(keys[0])
+            if entry is not None:
+                self.P, self.Q, self.V, self.theta = (entry[k].copy() for k in ('P', 'Q', 'V', 'theta'))
+                self.converged = True
+                return
+            entry = cache.nearest(keys[1], keys[2])
+            if entry is not None:
+                # Warm start: keep the specified slack angle and PV/slack voltages
+                theta = np.deg2rad(entry['theta']) - np.deg2rad(entry['theta'][self.slack_idx[0]]) + self.theta_0[self.slack_idx[0]]
+                theta[self.slack_idx] = self.theta_0[self.slack_idx]
+                V = self.V_0.copy()
+                V[self.pq_idx] = entry['V'][self.pq_idx]
             
         nbus = self.nbus
+        converged = False
 
         for iter in range(max_iter):
             P, Q = self.pq_calc(theta, V)
@@ -186,21 +264,34 @@ class AC_PF:
                     
 
             if np.linalg.norm(dP, np.inf)< tol_P and np.linalg.norm(dQ, np.inf) < tol_Q:
-                print("Converged in", iter, "iterations.")
+                if verbose:
+                    print("Converged in", iter, "iterations.")
+                converged = True
                 break
 
-            J = self.jacobian(theta, V, P, Q)
-            dX = np.linalg.solve(J, dX)
-            theta = theta + dX[:nbus]
-            V = V + dX[nbus:]
+            if method == 'reduced':
+                dtheta, dV = self.reduced_step(theta, V, dP, dQ)
+            elif method in ('fdxb', 'fdbx'):
+                dtheta, dV = self.decoupled_step(theta, V, dP, method)
+            else:
+                J = self.jacobian(theta, V, P, Q)
+                dX = spsolve(J.tocsc(), dX)
+                dtheta, dV = dX[:nbus], dX[nbus:]
+            theta = theta + dtheta
+            V = V + dV
 
         else:
-            print("Failed to converge in", max_iter, "iterations.")
+            if verbose:
+                print("Failed to converge in", max_iter, "iterations.")
 
         # Atualize state variables
         self.P, self.Q = self.pq_calc(theta=theta, V=V)
         self.V = V
         self.theta = np.rad2deg(theta)
+        self.converged = converged
+
+        if cache is not None and converged:
+            cache.put(*keys, {'P': self.P, 'Q': self.Q, 'V': self.V, 'theta': self.theta})
 
     def get_line_flows(self):
         """
@@ -209,36 +300,22 @@ class AC_PF:
             flows_from (np.ndarray): Fluxos do lado from_bus (Pij).
             flows_to (np.ndarray): Fluxos do lado to_bus (Pji).
         """
-        flows_from = []
-        flows_to = []
-        V = self.V
-        theta = self.theta
-        for line in self.network.lines:
-            i = self.bus_idx[line.from_bus.id]
-            j = self.bus_idx[line.to_bus.id]
-            r = getattr(line, 'r', 0.0)
-            x = getattr(line, 'x', 0.0)
-            b_shunt = getattr(line, 'b_half', 0.0)
-            z = r + 1j * x
-            y = 1 / z if z != 0 else 0
-            g = np.real(y)
-            b = np.imag(y)
-
-            Vi = V[i]
-            Vj = V[j]
-            thetai = np.deg2rad(theta[i])
-            thetaj = np.deg2rad(theta[j])
-            delta = thetai - thetaj
-
-            # Fluxo de potência ativa de i para j (Pij)
-            Pij = Vi**2 * g - Vi * Vj * (g * np.cos(delta) + b * np.sin(delta)) 
-
-            # Fluxo de potência ativa de j para i (Pji)
-            Pji = Vj**2 * g - Vj * Vi * (g * np.cos(-delta) + b * np.sin(-delta))
-
-            flows_from.append(Pij)
-            flows_to.append(Pji)
-        return np.array(flows_from), np.array(flows_to)
+        arr = self.network.arrays
+        y = arr.admittance
+        g = np.real(y)
+        b = np.imag(y)
+
+        Vi = self.V[arr.f]
+        Vj = self.V[arr.t]
+        delta = np.deg2rad(self.theta[arr.f] - self.theta[arr.t])
+
+        # Fluxo de potência ativa de i para j (Pij)
+        flows_from = Vi**2 * g - Vi * Vj * (g * np.cos(delta) + b * np.sin(delta))
+
+        # Fluxo de potência ativa de j para i (Pji)
+        flows_to = Vj**2 * g - Vj * Vi * (g * np.cos(-delta) + b * np.sin(-delta))
+
+        return flows_from, flows_to
     
     def print_sol(self):
         """
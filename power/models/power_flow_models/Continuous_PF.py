@@ -1,178 +1,362 @@
-from power.models.power_flow_models import AC_PF
 import numpy as np
+import scipy.sparse as sp
+from dataclasses import dataclass
+from scipy.sparse.linalg import splu
+from typing import List
+from power.models.power_flow_models.AC_PF import AC_PF
+from power.models.utils import FrozenArrays
+
+@dataclass(frozen=True)
+class CPFResults(FrozenArrays):
+    """
+    PV curves of a continuation power flow, one row per point of the curve.
+    The injections along the curve are S0 + lambda * direction, so lambda is the loading parameter
+    (with the default direction, the load increase as a fraction of the base load).
+    """
+    bus_names: List[str]
+    lambdas: np.ndarray # (n_points,)
+    V: np.ndarray # (n_points, n_buses) tensões (pu)
+    theta: np.ndarray # (n_points, n_buses) ângulos (graus)
+    max_loadability: float # Máximo lambda (refinado no nariz da curva)
+    critical_bus: int # Barra com a maior sensibilidade dV/dlambda no ponto de máximo carregamento
+    nose_found: bool # A curva passou do ponto de máximo carregamento
+    stop_reason: str # 'nose', 'lambda', 'lambda_uncorrected', 'voltage', 'min_step' ou 'max_steps'
+    n_factorizations: int # Fatorações LU do sistema aumentado
+
+    def pv_curve(self, bus) -> tuple:
+        """lambdas and voltage magnitudes (pu) of one bus (index or name)."""
+        idx = self.bus_names.index(bus) if isinstance(bus, str) else int(bus)
+        return self.lambdas, self.V[:, idx]
+
 
 class CPF(AC_PF):
+    """
+    Continuation power flow: traces the PV curves of the network from the base case past the point of
+    maximum loadability, with a tangent predictor, local parametrization (the continuation parameter is
+    the state with the largest tangent component, lambda at first and a voltage near the nose) and an
+    adaptive arc-length step. The unknowns are the angles of PV and PQ buses, the voltages of PQ buses
+    and lambda, as in AC_PF.reduced_jacobian. PV voltages are held (generator Q limits are not enforced).
+    """
     def __init__(self, network):
         super().__init__(network)
+        self._entries = None # Posições das entradas da matriz aumentada no padrão de Ybus
+        self._base = None # Caso base resolvido e fatoração LU do seu Jacobiano reduzido, comuns a todas as direções
 
-    def prediction(self):
-        pass
-
-    def correction(self):
-        pass
-
-    def CPF_(self, bus_idx, step):
-        self.solve(tol_P=1e-6, tol_Q=1e-6, max_iter=100, verbose=False) #Base case solution
-        lambda_corr = 0
-        #Prediction phase:
-        J = self.jacobian(theta=np.deg2rad(self.theta), V=self.V, P=self.P, Q=self.Q) #Jacobian in the base case
-        dP_dl = self.network.buses[bus_idx].p 
-        dQ_dl = self.network.buses[bus_idx].q
-        df_dl = np.zeros(2*self.nbus)
-        df_dl[bus_idx] = dP_dl
-        df_dl[self.nbus+bus_idx] = dQ_dl
-
-        J_aug = np.zeros((2*self.nbus+1, 2*self.nbus+1))
-        J_aug[:2 * self.nbus, :2 * self.nbus] = J
-        J_aug[:2 * self.nbus, -1] = df_dl
-        J_aug[-1, -1] = 1  # Força dλ/dλ = 1
-
-        rhs = np.zeros(2*self.nbus+1)
-        rhs[-1] = step
-
-        dx = np.linalg.solve(J_aug, rhs)
-        dtheta = dx[:self.nbus]
-        theta_pred = np.deg2rad(self.theta) + dtheta
-        dV = dx[self.nbus:2*self.nbus]
-        V_pred = self.V + dV
-        dl = dx[-1]
-        lambda_pred = lambda_corr + dl
-
-        #Correction phase: NR loop
-        theta = theta_pred.copy()
-        V = V_pred.copy()
-        lambda_val = lambda_pred
-        tol = 1e-6
-        max_iter = 20
-
-        for iter in range(max_iter):
-            P_calc, Q_calc = self.pq_calc(theta, V)
-            dP, dQ = self.power_mismatch(P_calc, Q_calc)
-            dX = np.concatenate((dP, dQ))
-            #dX_aug = np.append(dX, )
-            J = self.jacobian(theta, V, P_calc, Q_calc)
-            J_aug = 2
-
-
-
-
-    def _CPF(self, bus_idx, step=0.01, max_lambda=10.0, max_outer_iter=100):
-        """
-        Executa o CPF completo (múltiplos passos de predição + correção).
-        """
-        # Resolve o caso base
-        self.solve(verbose=False)
-        lambda_val = 0
-
-        # Inicializa variáveis de estado
-        theta = np.deg2rad(self.theta)
-        V = self.V.copy()
-
-        # Armazena histórico, se quiser plotar curva depois
-        lambdas = [lambda_val]
-        voltages = [V.copy()]
-
-        for outer_iter in range(max_outer_iter):
-            # ------------------
-            # 1. PREDIÇÃO
-            # ------------------
-            J = self.jacobian(theta, V, *self.pq_calc(theta, V))
-
-            dP_dl = self.P_esp[bus_idx]
-            dQ_dl = self.Q_esp[bus_idx]
-            df_dl = np.zeros(2 * self.nbus)
-            df_dl[bus_idx] = dP_dl
-            df_dl[self.nbus + bus_idx] = dQ_dl
-
-            J_aug = np.zeros((2 * self.nbus + 1, 2 * self.nbus + 1))
-            J_aug[:2 * self.nbus, :2 * self.nbus] = J
-            J_aug[:2 * self.nbus, -1] = df_dl
-            J_aug[-1, -1] = 1
-
-            rhs = np.zeros(2 * self.nbus + 1)
-            rhs[-1] = step
-
-            dx = np.linalg.solve(J_aug, rhs)
-            dtheta = dx[:self.nbus]
-            dV = dx[self.nbus:2 * self.nbus]
-            dl = dx[-1]
-
-            theta_pred = theta + dtheta
-            V_pred = V + dV
-            lambda_pred = lambda_val + dl
-
-            # ------------------
-            # 2. CORREÇÃO
-            # ------------------
-            theta = theta_pred.copy()
-            V = V_pred.copy()
-            lambda_val = lambda_pred
-
-            for load in self.network.loads:
-                idx = self.bus_idx[load.bus.id]
-                if idx == bus_idx:
-                    load.p_input = self.P_esp[idx] * lambda_val
-                    load.q_input = self.Q_esp[idx] * lambda_val
-
-            converged = False
-            for _ in range(20):  # Iterações NR internas
-                P_calc, Q_calc = self.pq_calc(theta, V)
-                dP, dQ = self.power_mismatch(P_calc, Q_calc)
-                mismatch = np.concatenate((dP, dQ))
-
-                if np.linalg.norm(mismatch, np.inf) < 1e-6:
-                    converged = True
-                    break
-
-                J = self.jacobian(theta, V, P_calc, Q_calc)
-                df_dl = np.zeros(2 * self.nbus)
-                df_dl[bus_idx] = self.P_esp[bus_idx]
-                df_dl[self.nbus + bus_idx] = self.Q_esp[bus_idx]
-
-                J_aug = np.zeros((2 * self.nbus + 1, 2 * self.nbus + 1))
-                J_aug[:2 * self.nbus, :2 * self.nbus] = J
-                J_aug[:2 * self.nbus, -1] = df_dl
-                J_aug[-1, -1] = 1
-
-                rhs = np.zeros(2 * self.nbus + 1)
-                rhs[:2 * self.nbus] = mismatch
-
-                dx = np.linalg.solve(J_aug, rhs)
-                dtheta = dx[:self.nbus]
-                dV = dx[self.nbus:2 * self.nbus]
-                dl = dx[-1]
+    def base_case(self, tol: float = 1e-8):
+        """
+        Solves the base case (reduced Newton method) and factorizes its reduced Jacobian, once per tolerance.
+        Every trace starts from this solution, and its first step only needs solves with this factorization.
+        Returns:
+            y (np.ndarray): Base continuation vector [theta_pvpq, V_pq, 0].
+        """
+        if self._base is None or self._base[0] != tol:
+            self.solve(tol_P=tol, tol_Q=tol, method='reduced')
+            if not self.converged:
+                raise ValueError("The base case power flow did not converge.")
+            self._theta = np.deg2rad(self.theta)
+            self._V = self.V.copy()
+            J = self.reduced_jacobian(self._theta, self._V)
+            order = self.reduced_ordering(J)
+            y = np.concatenate((self._theta[self.pvpq_idx], self._V[self.pq_idx], [0.0]))
+            self._base = (tol, y, order, splu(J[:, order], permc_spec='NATURAL'))
+        return self._base[1].copy()
+
+    def _base_solve(self):
+        """
+        Bordered solve at the base case with lambda as the continuation parameter, by block elimination
+        with the base factorization: J x - d lambda = r and lambda = s give x = J^-1 (r + s d).
+        """
+        _, _, order, lu = self._base
+        d = np.concatenate((self._dP[self.pvpq_idx], self._dQ[self.pq_idx]))
 
-                theta += dtheta
-                V += dV
-                lambda_val += dl
+        def solve(rhs):
+            x = np.empty(len(rhs) - 1)
+            x[order] = lu.solve(rhs[:-1] + rhs[-1] * d)
+            return np.append(x, rhs[-1])
+        return solve
 
-            if not converged:
-                print(f"Iteração {outer_iter}: correção falhou. Parando.")
+    def stress_direction(self, buses=None, generation: bool = False) -> tuple:
+        """
+        Injection change per unit of lambda: the loads of the given buses grow at constant power factor.
+        Args:
+            buses (list, optional): Bus indices whose loads grow. All loads if None.
+            generation (bool): Whether the non-slack generators pick up the extra load in proportion to
+                their base generation (otherwise the slack bus does).
+        Returns:
+            dP, dQ (np.ndarray): Active and reactive injection changes per bus (pu).
+        """
+        arr = self.arrays
+        load_p = np.asarray(arr.load_p, dtype=float)
+        load_q = np.asarray(arr.load_q, dtype=float)
+        if buses is not None:
+            selected = np.isin(arr.load_bus, np.asarray(buses, dtype=np.int64))
+            load_p = np.where(selected, load_p, 0)
+            load_q = np.where(selected, load_q, 0)
+        dP = -np.bincount(arr.load_bus, load_p, self.nbus)
+        dQ = -np.bincount(arr.load_bus, load_q, self.nbus)
+        if generation:
+            gen_p = np.where(np.isin(arr.gen_bus, self.slack_idx), 0, arr.gen_p)
+            if gen_p.sum() > 0:
+                dP += np.bincount(arr.gen_bus, gen_p, self.nbus) * (load_p.sum() / gen_p.sum())
+        return dP, dQ
+
+    def _unpack(self, y):
+        """theta (rad), V and lambda from the continuation vector [theta_pvpq, V_pq, lambda]."""
+        npvpq = len(self.pvpq_idx)
+        theta = self._theta.copy()
+        V = self._V.copy()
+        theta[self.pvpq_idx] = y[:npvpq]
+        V[self.pq_idx] = y[npvpq:-1]
+        return theta, V, y[-1]
+
+    def _residual(self, y) -> np.ndarray:
+        """Power flow equations S(theta, V) - S0 - lambda * direction of the unknown injections."""
+        theta, V, lam = self._unpack(y)
+        P, Q = self.pq_calc(theta, V)
+        dP = P - self.P_esp - lam * self._dP
+        dQ = Q - self.Q_esp - lam * self._dQ
+        return np.concatenate((dP[self.pvpq_idx], dQ[self.pq_idx]))
+
+    def _pattern(self):
+        """
+        Positions of the entries of the bordered matrix, from the sparsity pattern of Ybus (fixed while
+        tracing): rows and ordered columns of the H, N, M and L entries of each Ybus element and of each
+        diagonal, so that each factorization only evaluates the derivatives on these entries.
+        """
+        if self._entries is None:
+            Y = self.Ybus.tocoo()
+            npvpq, npq = len(self.pvpq_idx), len(self.pq_idx)
+            n = npvpq + npq + 1
+            row_p = np.full(self.nbus, -1)
+            row_p[self.pvpq_idx] = np.arange(npvpq)
+            row_q = np.full(self.nbus, -1)
+            row_q[self.pq_idx] = npvpq + np.arange(npq)
+            J = self.reduced_jacobian(self._theta, self._V)
+            position = np.empty(n, dtype=np.int64) # Coluna de cada incógnita na ordem da fatoração
+            position[np.append(self.reduced_ordering(J), n - 1)] = np.arange(n)
+            buses = np.arange(self.nbus)
+            i = np.concatenate((Y.row, buses))
+            j = np.concatenate((Y.col, buses))
+            blocks = [] # (máscara, linhas, colunas) de H, N, M e L
+            for rows, cols in ((row_p, row_p), (row_p, row_q), (row_q, row_p), (row_q, row_q)):
+                mask = (rows[i] >= 0) & (cols[j] >= 0)
+                blocks.append((mask, rows[i][mask], position[cols[j][mask]]))
+            border = np.arange(n - 1)
+            self._entries = (Y.row, Y.col, Y.data, blocks, border, position)
+        return self._entries
+
+    def _factor(self, y, k: int):
+        """
+        Sparse LU of the bordered matrix [[J, -direction], [e_k']] at y, assembled on the pattern of Ybus.
+        The columns keep the ordering of the reduced Jacobian (AC_PF.reduced_ordering, computed once per
+        topology), with lambda last.
+        """
+        theta, V, _ = self._unpack(y)
+        yi, yj, ydata, blocks, border, position = self._pattern()
+        n = len(y)
+        Vc = V * np.exp(1j * theta)
+        I = self.Ybus @ Vc
+        YV = ydata * Vc[yj]
+        # dS/dtheta e dS/d|V| em cada elemento de Ybus, seguidos dos termos diagonais
+        dS_dtheta = np.concatenate((-1j * Vc[yi] * np.conj(YV), 1j * Vc * np.conj(I)))
+        dS_dV = np.concatenate((Vc[yi] * np.conj(YV / V[yj]), np.conj(I) * Vc / V))
+        values = (dS_dtheta.real, dS_dV.real, dS_dtheta.imag, dS_dV.imag)
+
+        d = np.concatenate((self._dP[self.pvpq_idx], self._dQ[self.pq_idx]))
+        rows = [r for _, r, _ in blocks] + [border, [n - 1]]
+        cols = [c for _, _, c in blocks] + [np.full(n - 1, n - 1), [position[k]]]
+        data = [v[mask] for v, (mask, _, _) in zip(values, blocks)] + [-d, [1.0]]
+        A = sp.csc_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))), shape=(n, n))
+        self._n_factorizations += 1
+        lu = splu(A, permc_spec='NATURAL')
+
+        def solve(rhs):
+            return lu.solve(rhs)[position]
+        return solve
+
+    def prediction(self, y, tangent_prev, step: float, solve=None):
+        """
+        Tangent predictor. The tangent solves [[J, -direction], [e_k']] t = [0, 1] for the local parameter k
+        of the previous tangent, is normalized, and keeps the orientation of the previous one.
+        Args:
+            solve (callable, optional): Bordered solve for the parameter of tangent_prev to reuse, e.g. the
+                last factorization of the corrector (the tangent is then approximate). Factorized at y if None.
+        Returns:
+            y_pred (np.ndarray): Predicted point, y + step * t.
+            tangent (np.ndarray): Unit tangent at y.
+            k (int): Continuation parameter of the corrector (largest tangent component).
+            solve (callable): The bordered solve, to be reused by the corrector when k does not change.
+        """
+        k_prev = int(np.argmax(np.abs(tangent_prev)))
+        if solve is None:
+            solve = self._factor(y, k_prev)
+        rhs = np.zeros(len(y))
+        rhs[-1] = 1.0
+        tangent = solve(rhs)
+        tangent /= np.linalg.norm(tangent)
+        if tangent @ tangent_prev < 0:
+            tangent = -tangent
+        k = int(np.argmax(np.abs(tangent)))
+        return y + step * tangent, tangent, k, (solve if k == k_prev else None)
+
+    def correction(self, y_pred, k: int, solve=None, tol: float = 1e-8, max_iter: int = 10):
+        """
+        Corrector with local parametrization: Newton on the power flow equations with y[k] fixed at its
+        predicted value. It starts with the given factorization (chord iterations) and refactorizes at
+        the current point when the mismatch stops shrinking fast enough.
+        Returns:
+            y (np.ndarray): Corrected point.
+            iterations (int): Number of corrector iterations, or None if it did not converge.
+            solve (callable): The last bordered solve used, to be reused by the next step (None on failure).
+        """
+        y = y_pred.copy()
+        previous = np.inf
+        for iteration in range(max_iter + 1):
+            F = self._residual(y)
+            error = np.linalg.norm(F, np.inf)
+            if not np.isfinite(error):
+                return y, None, None
+            if error < tol:
+                return y, iteration, solve
+            if solve is None or error > 0.5 * previous:
+                try:
+                    solve = self._factor(y, k)
+                except RuntimeError: # Matriz aumentada singular
+                    return y, None, None
+            previous = error
+            dy = solve(np.append(-F, 0.0))
+            if not np.all(np.isfinite(dy)):
+                return y, None, None
+            y = y + dy
+        return y, None, None
+
+    def trace(self, direction=None, step: float = 0.1, min_step: float = 1e-4, max_step: float = 1.0,
+              max_steps: int = 500, max_lambda: float = np.inf, v_min: float = 0.0, stop_at_nose: bool = True,
+              tol: float = 1e-8, max_iter: int = 10) -> CPFResults:
+        """
+        Traces the PV curves from the base case (see base_case, shared by the traces of this instance).
+        Args:
+            direction (tuple, optional): (dP, dQ) injection changes per unit of lambda (pu, per bus).
+                Defaults to all loads growing at constant power factor (see stress_direction).
+            step (float): Initial arc-length step, in the space of the unknowns with lambda scaled by the
+                largest injection change of the direction.
+            min_step, max_step (float): Step bounds. The step grows after easy corrections, shrinks after
+                hard ones and is halved after a failed one; the trace stops below min_step.
+            max_steps (int): Maximum number of points.
+            max_lambda (float): Stop when lambda reaches this value; the last point is placed on it, so the
+                maximum loadability of a capped trace (stop_reason 'lambda' without nose) is max_lambda.
+                If that point cannot be corrected, the curve ends at the last converged point below the cap
+                and stop_reason is 'lambda_uncorrected' (the maximum loadability is still max_lambda).
+            v_min (float): Stop when a voltage falls below this value (pu).
+            stop_at_nose (bool): Stop right after the maximum loadability point. Otherwise the lower
+                part of the curve is traced until lambda returns to zero.
+            tol (float): Mismatch tolerance of the base case and of the corrector (pu).
+            max_iter (int): Maximum corrector iterations per point.
+        Returns:
+            CPFResults: The PV curves and the maximum loadability.
+        """
+        dP, dQ = self.stress_direction() if direction is None else direction
+        dP = np.asarray(dP, dtype=float)
+        dQ = np.asarray(dQ, dtype=float)
+        if dP.shape != (self.nbus,) or dQ.shape != (self.nbus,):
+            raise ValueError(f"direction must be two arrays of {self.nbus} values.")
+        # Internamente a direção é normalizada (maior variação de injeção = 1 pu), para que o passo
+        # acompanhe a variação do estado qualquer que seja a escala da direção; lambda é reescalado no fim
+        scale = max(np.abs(dP).max(initial=0), np.abs(dQ).max(initial=0))
+        if scale == 0:
+            raise ValueError("The direction does not change any injection.")
+        self._dP, self._dQ = dP / scale, dQ / scale
+        self._n_factorizations = 0
+        y = self.base_case(tol)
+        solve = self._base_solve() # Reutilizada enquanto o corretor convergir rápido com ela
+
+        tangent = np.zeros(len(y))
+        tangent[-1] = 1.0 # Primeiro passo na direção de lambda crescente
+        points, step_lengths = [y], []
+        nose, nose_tangent, stop_reason = None, None, 'max_steps'
+        while len(points) < max_steps:
+            y_pred, new_tangent, k, solve = self.prediction(y, tangent, step, solve)
+            if nose is None and new_tangent[-1] < 0 < tangent[-1]:
+                # O nariz está entre os dois últimos pontos: lambda(s) quadrática com derivadas t_lambda nos extremos
+                t0, t1 = tangent[-1], new_tangent[-1]
+                nose = points[-2][-1] + 0.5 * step_lengths[-1] * t0**2 / (t0 - t1)
+                if nose / scale >= max_lambda:
+                    # A curva atinge max_lambda antes do nariz: a margem é o próprio limite
+                    nose, stop_reason = max_lambda * scale, 'lambda'
+                    break
+                nose_tangent = tangent if t0 < -t1 else new_tangent
+                if stop_at_nose:
+                    stop_reason = 'nose'
+                    break
+            y_new, iterations, solve = self.correction(y_pred, k, solve, tol, max_iter)
+            if iterations is None:
+                step /= 2
+                if step < min_step:
+                    stop_reason = 'min_step'
+                    break
+                continue
+
+            step_lengths.append(np.linalg.norm(y_new - y))
+            points.append(y_new)
+            y, tangent = y_new, new_tangent
+            if iterations <= 4:
+                step = min(step * 1.5, max_step)
+            else:
+                solve = None # Fatoração desatualizada: refatora no novo ponto
+                if iterations > 6:
+                    step = max(step * 0.7, min_step)
+
+            _, V, lam = self._unpack(y)
+            if lam / scale >= max_lambda:
+                # O último ponto passou do limite: é trazido para lambda = max_lambda, interpolado no último
+                # trecho e corrigido com lambda fixo. Se a correção falhar, a curva termina no último ponto
+                # convergido abaixo do limite
+                y_prev = points[-2]
+                y_cap = y_prev + (y - y_prev) * (max_lambda * scale - y_prev[-1]) / (y[-1] - y_prev[-1])
+                y_cap[-1] = max_lambda * scale
+                y_corr, iterations, _ = self.correction(y_cap, len(y) - 1, None, tol, max_iter)
+                if iterations is None:
+                    points.pop()
+                    stop_reason = 'lambda_uncorrected'
+                else:
+                    points[-1] = y_corr
+                    stop_reason = 'lambda'
                 break
-
-            # Armazena histórico
-            lambdas.append(lambda_val)
-            voltages.append(V.copy())
-
-            # Critério de parada
-            if lambda_val >= max_lambda:
-                print(f"Parou: λ = {lambda_val:.4f} >= {max_lambda}")
+            if V.min() < v_min:
+                stop_reason = 'voltage'
                 break
-            if np.any(V < 0.7):  # tensão colapsando
-                print("Parou: tensão mínima violada.")
+            if nose is not None and lam <= 0:
+                stop_reason = 'lambda'
                 break
 
-        # Atualiza estado final
-        self.theta = np.rad2deg(theta)
-        self.V = V
-        self.P, self.Q = self.pq_calc(theta, V)
-
-        print("CPF finalizado.")
-        self.print_sol()
-
-        return lambdas, voltages
-
-
-
-
-
+        states = [self._unpack(p) for p in points]
+        lambdas = np.array([lam for _, _, lam in states]) / scale
+        V = np.array([v for _, v, _ in states])
+        theta = np.rad2deg(np.array([t for t, _, _ in states]))
+
+        max_loadability = float(lambdas.max()) if nose is None else max(float(lambdas.max()), float(nose) / scale)
+        if stop_reason == 'lambda_uncorrected':
+            max_loadability = float(max_lambda) # A curva passou do limite, mas o ponto nele não foi corrigido
+
+        # Barra crítica: maior componente de tensão do vetor tangente no nariz (ou no último ponto)
+        final_tangent = nose_tangent if nose_tangent is not None else tangent
+        npvpq = len(self.pvpq_idx)
+        dV = np.zeros(self.nbus)
+        dV[self.pq_idx] = np.abs(final_tangent[npvpq:-1])
+        critical_bus = int(np.argmax(dV)) if len(self.pq_idx) else -1
+
+        # Estado final: último ponto da curva
+        self.theta, self.V = theta[-1], V[-1].copy()
+        self.P, self.Q = self.pq_calc(np.deg2rad(self.theta), self.V)
+
+        return CPFResults(
+            bus_names=list(self.arrays.bus_names),
+            lambdas=lambdas,
+            V=V,
+            theta=theta,
+            max_loadability=max_loadability,
+            critical_bus=critical_bus,
+            nose_found=nose_tangent is not None,
+            stop_reason=stop_reason,
+            n_factorizations=self._n_factorizations,
+        )
@@ -1,26 +1,52 @@
 import numpy as np
+import scipy.sparse as sp
+from itertools import islice
 from power.models.electricity_models.network_models import *
 
 class DC_PF:
     def __init__(self, network: Network):
 
-        network.ACtoDC()  # Convert AC network to DC
         self.network = network
+        network.check_connected()
+
+        # Per-unit DC projection of the network (the network itself is not modified)
+        self.arrays = arr = network.dc_arrays
 
         # Identify buses by index
-        self.bus_idx = {bus.id: i for i, bus in enumerate(network.buses)}
+        self.bus_idx = network.bus_idx
 
         # Identify bus types by index
-        self.slack_idx = next(i for i, bus in enumerate(network.buses) if bus.bus_type == 'Slack')
+        self.slack_idx = int(arr.slack_idx[0])
 
         # Active power vector
-        self.P = np.array([bus.p for bus in network.buses])
-
-        # Reduced admittance matrix and power vector
-        B = network.get_B()
-        B_red = np.delete(B, self.slack_idx, axis=0)
-        self.B_red = -1*np.delete(B_red, self.slack_idx, axis=1)
-        self.P_red = np.delete(self.P, self.slack_idx)
+        self.P = arr.p.copy()
+
+        # Reduced admittance matrix (sparse) and power vector
+        self.keep_idx = np.delete(np.arange(arr.nbus), self.slack_idx) # Non-slack buses
+        B = arr.y_bus().imag
+        self.B_red = (-1*B[self.keep_idx][:, self.keep_idx]).tocsc()
+        self.P_red = self.P[self.keep_idx]
+        self._lu = None
+
+    @property
+    def lu(self):
+        """Sparse LU factorization of B_red, computed once (and shared through the network cache) and reused by every solve."""
+        if self._lu is None:
+            _, self._lu = self.network.dc_factor()
+        return self._lu
+
+    @property
+    def Bf(self) -> sp.csr_matrix:
+        """Sparse branch matrix mapping bus angles to line flows: flows = Bf @ theta."""
+        arr = self.arrays
+        if np.any(arr.x == 0):
+            line = self.network.lines[int(np.flatnonzero(arr.x == 0)[0])]
+            raise ValueError(f"Line {line.id} has zero reactance, cannot calculate flow.")
+
+        rows = np.concatenate((np.arange(arr.nline), np.arange(arr.nline)))
+        cols = np.concatenate((arr.f, arr.t))
+        data = np.concatenate((1 / arr.x, -1 / arr.x))
+        return sp.csr_matrix((data, (rows, cols)), shape=(arr.nline, arr.nbus))
 
     def get_line_flows(self):
         """
@@ -33,20 +59,7 @@ class DC_PF:
         if not hasattr(self, 'theta_rad'):
             raise ValueError("DC power flow has not been solved yet. Call solve() first.")
 
-        flows = []
-        for line in self.network.lines:
-            i = self.bus_idx[line.from_bus.id]
-            j = self.bus_idx[line.to_bus.id]
-
-            theta_i = self.theta_rad[i]
-            theta_j = self.theta_rad[j]
-
-            if line.reactance == 0:
-                raise ValueError(f"Line {line.id} has zero reactance, cannot calculate flow.")
-            
-            flow = (theta_i - theta_j) / line.reactance
-            flows.append(flow)
-        self.flows = np.array(flows)
+        self.flows = self.Bf @ self.theta_rad
         
         return self.flows
 
@@ -55,7 +68,7 @@ class DC_PF:
         Solve the DC power flow problem.
         """
         # Solve B_red * theta_red = P_red
-        theta = np.linalg.solve(self.B_red, self.P_red)
+        theta = self.lu.solve(self.P_red)
 
         # Reinsert slack angle (theta = 0) into full vector
         theta = np.insert(theta, self.slack_idx, 0)
@@ -66,6 +79,59 @@ class DC_PF:
 
         return self.theta_deg
 
+    def series_injections(self) -> np.ndarray:
+        """
+        Builds the injection matrix (n_bus, T) from the load curves (Load.p_input_series).
+        Generators keep their scalar injection and loads without a curve keep their scalar p.
+        """
+        arr = self.arrays
+        load_p = self.network.load_p_series()
+
+        # Bus x load incidence
+        nload = len(arr.load_bus)
+        Cl = sp.csr_matrix((np.ones(nload), (arr.load_bus, np.arange(nload))), shape=(arr.nbus, nload))
+        generation = np.bincount(arr.gen_bus, arr.gen_p, arr.nbus)
+        return generation[:, None] - Cl @ load_p
+
+    def solve_series(self, injections=None, batch_size=1024):
+        """
+        Solve the DC power flow for many injection vectors with a single factorization.
+        Args:
+            injections (np.ndarray or iterable, optional): Injection matrix of shape (n_bus, T) in pu,
+                or an iterable (e.g. a generator) of injection vectors of size n_bus.
+                If None, the load curves of the network are used (see series_injections).
+            batch_size (int): Number of vectors solved together when an iterable is given.
+        Returns:
+            theta (np.ndarray): Bus angles in radians, shape (n_bus, T).
+            flows (np.ndarray): Line flows in pu, shape (n_line, T).
+        """
+        if injections is None:
+            injections = self.series_injections()
+
+        if isinstance(injections, np.ndarray):
+            if injections.ndim != 2 or injections.shape[0] != len(self.P):
+                raise ValueError(f"Injections must have shape (n_bus, T) = ({len(self.P)}, T), got {injections.shape}.")
+            return self._solve_block(injections)
+
+        thetas, flows = [], []
+        vectors = iter(injections)
+        while True:
+            batch = list(islice(vectors, batch_size))
+            if not batch:
+                break
+            theta, flow = self._solve_block(np.column_stack(batch))
+            thetas.append(theta)
+            flows.append(flow)
+        if not thetas:
+            return np.zeros((len(self.P), 0)), np.zeros((len(self.network.lines), 0))
+        return np.hstack(thetas), np.hstack(flows)
+
+    def _solve_block(self, P):
+        """Solves B_red * theta_red = P_red for every column of P at once."""
+        theta = np.zeros(P.shape, dtype=float)
+        theta[self.keep_idx] = self.lu.solve(np.ascontiguousarray(P[self.keep_idx], dtype=float))
+        return theta, self.Bf @ theta
+
     def print_results(self):
         """
         Print the results of the DC power flow solution.
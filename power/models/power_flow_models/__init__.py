@@ -1,5 +1,7 @@
 from .AC_PF import AC_PF
 from .DC_PF import DC_PF
-from .Continuous_PF import CPF
+from .Continuous_PF import CPF, CPFResults
+from .loadability import LoadabilityResults, loadability_screen, stress_matrix
+from .islands import IslandResults, solve_islands
 
-__all__ = ["AC_PF", "DC_PF", "CPF"]
+__all__ = ["AC_PF", "DC_PF", "CPF", "CPFResults", "LoadabilityResults", "loadability_screen", "stress_matrix", "IslandResults", "solve_islands"]
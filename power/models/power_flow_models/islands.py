@@ -0,0 +1,144 @@
+"""
+Power flow of a network split into islands: each energized island is solved on its own, large ones in parallel,
+and the results are merged back into network-wide arrays.
+"""
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+from power.models.electricity_models import *
+from power.models.power_flow_models.AC_PF import AC_PF
+from power.models.power_flow_models.DC_PF import DC_PF
+from power.models.utils import FrozenArrays, pandas, default_workers
+
+
+@dataclass(frozen=True)
+class IslandResults(FrozenArrays):
+    """
+    Power flow of every island, in network-wide arrays (positions of network.buses and network.lines).
+    Buses of de-energized islands (no generator) have V = 0 and zero injections; their lines carry no flow.
+    The angles of each island refer to its own slack bus.
+    """
+    method: str # 'ac' ou 'dc'
+    bus_names: List[str]
+    line_names: List[str]
+    island: np.ndarray # Ilha de cada barra
+    slack: np.ndarray # Barra slack de cada ilha (-1 se desenergizada)
+    assigned_slack: np.ndarray # Se a slack de cada ilha foi escolhida pelo processador de topologia
+    converged: np.ndarray # Por ilha (True para as desenergizadas)
+    V: np.ndarray
+    theta: np.ndarray # Graus
+    P: np.ndarray
+    Q: np.ndarray
+    flows: np.ndarray # Fluxo ativo de cada linha, do lado da barra de origem (pu)
+
+    @property
+    def n_islands(self) -> int:
+        return len(self.slack)
+
+    @property
+    def energized(self) -> np.ndarray:
+        """Whether each bus belongs to an island with generation."""
+        return self.slack[self.island] >= 0
+
+    def to_frame(self):
+        """One row per bus: island, voltage, angle and injections."""
+        pd = pandas()
+        return pd.DataFrame({
+            'Island': self.island,
+            'V': self.V,
+            'Theta': self.theta,
+            'P': self.P,
+            'Q': self.Q,
+            'Energized': self.energized,
+        }, index=self.bus_names)
+
+
+def _solve_island(network: Network, method: str, options: dict) -> tuple:
+    """
+    Power flow of one island network.
+    Returns:
+        V, theta (deg), P, Q (np.ndarray): Per bus of the island.
+        flows (np.ndarray): Per line of the island.
+        converged (bool): Whether the mismatches are below the tolerance (always True for 'dc').
+    """
+    if method == 'dc':
+        pf = DC_PF(network)
+        theta = pf.solve()
+        flows = pf.get_line_flows()
+        P = network.incidence().T @ flows # Injeções líquidas, incluindo o balanço assumido pela slack
+        nbus = len(P)
+        return np.ones(nbus), theta, P, np.zeros(nbus), flows, True
+
+    tol = options.get('tol', 1e-6)
+    pf = AC_PF(network)
+    pf.solve(tol_P=tol, tol_Q=tol, max_iter=options.get('max_iter', 100), method=options.get('method', 'reduced'))
+    flows, _ = pf.get_line_flows()
+    return pf.V, pf.theta, pf.P, pf.Q, flows, pf.converged
+
+
+def solve_islands(network: Network, method: str = 'ac', workers: Optional[int] = None, parallel_buses: int = 1000,
+                  **options) -> IslandResults:
+    """
+    Topology processing followed by one power flow per island. The islands and their slack buses come from
+    find_islands (a slack is assigned to islands without one); each energized island is copied into a network
+    of its own (island_network) and solved with AC_PF or DC_PF. The original network is not modified.
+    Args:
+        network (Network): The network, connected or not.
+        method (str): 'ac' (AC_PF) or 'dc' (DC_PF).
+        workers (int, optional): Processes for the islands with at least parallel_buses buses, when there is
+            more than one of them; 0 or 1 solves everything in this process, None uses every usable CPU.
+        parallel_buses (int): Size from which an island is sent to the process pool. Smaller islands are solved
+            in this process, where they cost less than the transfer.
+        options: AC_PF.solve options: tol (both mismatches, default 1e-6), max_iter and method (default 'reduced').
+    Returns:
+        IslandResults: The merged results.
+    """
+    if method not in ('ac', 'dc'):
+        raise ValueError(f"Unknown method '{method}'. Use 'ac' or 'dc'.")
+    arr = network.arrays
+    islands = find_islands(network)
+    energized = [island for island in islands if island.energized]
+    subnetworks = {island.index: island_network(network, island) for island in energized}
+
+    if workers is None:
+        workers = default_workers()
+    large = [island.index for island in energized if len(island) >= parallel_buses]
+    if workers <= 1 or len(large) < 2:
+        large = []
+
+    solutions = {}
+    if large:
+        with ProcessPoolExecutor(max_workers=min(workers, len(large))) as pool:
+            futures = {k: pool.submit(_solve_island, subnetworks[k], method, options) for k in large}
+            # As ilhas pequenas são resolvidas neste processo enquanto as grandes estão no pool
+            for island in energized:
+                if island.index not in futures:
+                    solutions[island.index] = _solve_island(subnetworks[island.index], method, options)
+            for k, future in futures.items():
+                solutions[k] = future.result()
+    else:
+        for island in energized:
+            solutions[island.index] = _solve_island(subnetworks[island.index], method, options)
+
+    V, theta, P, Q = (np.zeros(arr.nbus) for _ in range(4))
+    flows = np.zeros(arr.nline)
+    converged = np.ones(len(islands), dtype=bool)
+    for island in energized:
+        V[island.buses], theta[island.buses], P[island.buses], Q[island.buses], flows[island.lines], \
+            converged[island.index] = solutions[island.index]
+
+    return IslandResults(
+        method=method,
+        bus_names=list(arr.bus_names),
+        line_names=list(arr.line_names),
+        island=np.array(network.islands()),
+        slack=np.array([island.slack for island in islands], dtype=np.int64),
+        assigned_slack=np.array([island.assigned for island in islands], dtype=bool),
+        converged=converged,
+        V=V,
+        theta=theta,
+        P=P,
+        Q=Q,
+        flows=flows,
+    )
@@ -0,0 +1,148 @@
+"""
+Loadability screening: continuation power flows for many stress directions, sharing one base case.
+"""
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+from power.models.electricity_models import *
+from power.models.power_flow_models.Continuous_PF import CPF
+from power.models.utils import FrozenArrays, pandas, default_workers
+
+# Estado de cada processo de trabalho: CPF com o caso base resolvido e fatorado uma única vez
+_WORKER = {}
+
+
+@dataclass(frozen=True)
+class LoadabilityResults(FrozenArrays):
+    """
+    Loadability margins of many stress directions, one entry per direction (row of the direction matrix).
+    The margin is the maximum lambda of the continuation power flow along the direction;
+    NaN when the trace failed (see stop_reason).
+    """
+    bus_names: List[str]
+    margin: np.ndarray # Máximo carregamento (lambda) de cada direção
+    critical_bus: np.ndarray # Barra crítica de cada direção (-1 se falhou)
+    nose_found: np.ndarray
+    min_voltage: np.ndarray # Menor tensão no último ponto traçado (pu)
+    n_points: np.ndarray
+    n_factorizations: np.ndarray
+    stop_reason: List[str]
+
+    def __len__(self) -> int:
+        return len(self.margin)
+
+    def ranking(self) -> np.ndarray:
+        """Directions from the smallest to the largest margin (failed ones last)."""
+        return np.argsort(np.where(np.isnan(self.margin), np.inf, self.margin), kind='stable')
+
+    def to_frame(self):
+        """One row per direction: margin, critical bus, whether the nose was reached and why the trace stopped."""
+        pd = pandas()
+        names = np.asarray(self.bus_names + [None], dtype=object)
+        return pd.DataFrame({
+            'Margin': self.margin,
+            'Critical Bus': names[self.critical_bus],
+            'Nose Found': self.nose_found,
+            'Min Voltage': self.min_voltage,
+            'Points': self.n_points,
+            'Factorizations': self.n_factorizations,
+            'Stop Reason': self.stop_reason,
+        })
+
+
+def stress_matrix(network: Network, groups=None, generation: bool = False) -> np.ndarray:
+    """
+    Stress directions of groups of buses: each row grows the loads of one group at constant power factor
+    (see CPF.stress_direction).
+    Args:
+        network (Network): The network.
+        groups (list, optional): One entry per direction: a list of bus indices (an area), a single
+            bus index, or None for the whole system. Defaults to one direction per bus with load.
+        generation (bool): Whether the non-slack generators pick up the extra load.
+    Returns:
+        np.ndarray: Complex matrix (n_directions, n_buses), dP + j dQ in pu per unit of lambda.
+    """
+    cpf = CPF(network)
+    if groups is None:
+        groups = [[b] for b in np.unique(network.arrays.load_bus)]
+    rows = []
+    for group in groups:
+        buses = None if group is None else np.atleast_1d(group)
+        dP, dQ = cpf.stress_direction(buses, generation)
+        rows.append(dP + 1j * dQ)
+    return np.array(rows, dtype=complex).reshape(-1, cpf.nbus)
+
+
+def _init_worker(network: Network, directions: np.ndarray, options: dict):
+    _WORKER.clear()
+    _WORKER.update(cpf=CPF(network), directions=directions, options=options)
+
+
+def _run_chunk(indices: list) -> list:
+    """Traces the given directions with the CPF of this process; errors are recorded per direction."""
+    cpf, directions, options = _WORKER['cpf'], _WORKER['directions'], _WORKER['options']
+    records = []
+    for i in indices:
+        try:
+            result = cpf.trace((directions[i].real, directions[i].imag), **options)
+            records.append((i, result.max_loadability, result.critical_bus, result.nose_found,
+                            float(result.V[-1].min()), len(result.lambdas), result.n_factorizations, result.stop_reason))
+        except Exception as error:
+            records.append((i, np.nan, -1, False, np.nan, 0, 0, repr(error)))
+    return records
+
+
+def loadability_screen(network: Network, directions, workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                       **trace_options) -> LoadabilityResults:
+    """
+    Continuation power flows (CPF.trace) for every stress direction, stopping at the nose of each curve.
+    The base case is solved and its Jacobian factorized once per process and shared by all the directions
+    it traces, as is the column ordering of the reduced Jacobian (network cache).
+    Args:
+        network (Network): The network. It is sent to each worker once (pool initializer), without its cache;
+            tasks only carry direction indices.
+        directions (np.ndarray): Stress directions (n_directions, n_buses), dP + j dQ per bus in pu per unit
+            of lambda (real matrices have dQ = 0). See stress_matrix.
+        workers (int, optional): Number of processes; 0 runs in this process, None uses every usable CPU.
+        chunk_size (int, optional): Directions per task. Defaults to about 4 tasks per worker.
+        trace_options: Options of CPF.trace (step, max_step, tol, ...).
+    Returns:
+        LoadabilityResults: Margins and critical buses, in the order of the directions.
+    """
+    directions = np.asarray(directions)
+    if directions.ndim != 2 or directions.shape[1] != len(network.buses):
+        raise ValueError(f"directions must have shape (n_directions, {len(network.buses)}), got {directions.shape}.")
+    directions = directions.astype(complex)
+    trace_options.setdefault('stop_at_nose', True)
+    if workers is None:
+        workers = default_workers()
+    n = len(directions)
+    if chunk_size is None:
+        chunk_size = int(max(1, np.ceil(n / (4 * max(workers, 1)))))
+    chunks = [list(range(start, min(start + chunk_size, n))) for start in range(0, n, chunk_size)]
+
+    records = []
+    if workers == 0:
+        _init_worker(network, directions, trace_options)
+        for chunk in chunks:
+            records += _run_chunk(chunk)
+        _WORKER.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(network, directions, trace_options)) as pool:
+            for chunk_records in pool.map(_run_chunk, chunks):
+                records += chunk_records
+
+    records.sort(key=lambda record: record[0])
+    _, margin, critical, nose, v_min, points, factorizations, reasons = zip(*records) if records else ([],) * 8
+    return LoadabilityResults(
+        bus_names=list(network.arrays.bus_names),
+        margin=np.array(margin, dtype=float),
+        critical_bus=np.array(critical, dtype=np.int64),
+        nose_found=np.array(nose, dtype=bool),
+        min_voltage=np.array(v_min, dtype=float),
+        n_points=np.array(points, dtype=np.int64),
+        n_factorizations=np.array(factorizations, dtype=np.int64),
+        stop_reason=list(reasons),
+    )
@@ -0,0 +1,105 @@
+import os
+import pickle
+import numpy as np
+from collections import OrderedDict
+from typing import Optional
+from power.models.electricity_models.network_models.network_arrays import stable_hash
+
+class SolveCache:
+    """
+    Opt-in cache of solutions, shared by PNL_OPF.solve and AC_PF.solve (argument `cache`).
+    Entries are addressed by a stable hash of the solved data (network arrays, model parameters)
+    and of the formulation flags (model, solver, tolerances). They are kept in memory with an LRU
+    size cap and, optionally, in an on-disk store (one pickle per entry, never evicted).
+    Entries with the same structure (topology and flags) but different data are near misses:
+    the closest one in memory is offered as a warm start.
+    Only use on-disk stores written by yourself: they are loaded with pickle.
+    """
+    def __init__(self, max_entries: int = 256, path: Optional[str] = None):
+        """
+        Args:
+            max_entries (int): Maximum number of entries kept in memory.
+            path (str, optional): Directory of the on-disk store. In memory only if None.
+        """
+        self.max_entries = max_entries
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self._entries = OrderedDict() # key -> (structure, data, entry)
+        self._by_structure = {} # structure -> {key}
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def keys(structure_parts, data_parts) -> tuple:
+        """
+        Builds the cache keys of a solve.
+        Args:
+            structure_parts: Anything that must match exactly for a warm start (topology, flags).
+            data_parts (list of np.ndarray): Numeric data of the solve.
+        Returns:
+            key (str), structure (str), data (np.ndarray)
+        """
+        structure = stable_hash(structure_parts, [np.shape(d) for d in data_parts])
+        data = np.concatenate([np.asarray(d, dtype=float).ravel() for d in data_parts])
+        return stable_hash(structure, data), structure, data
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f'{key}.pkl')
+
+    def get(self, key: str):
+        """Returns the entry stored under key (memory first, then disk), or None."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][2]
+        if self.path is not None and os.path.exists(self._file(key)):
+            with open(self._file(key), 'rb') as f:
+                structure, data, entry = pickle.load(f)
+            self._insert(key, structure, data, entry)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def nearest(self, structure: str, data: np.ndarray):
+        """Returns the entry in memory with the same structure and the closest data, or None."""
+        keys = self._by_structure.get(structure)
+        if not keys:
+            return None
+        data = np.nan_to_num(data, posinf=1e30, neginf=-1e30)
+        key = min(keys, key=lambda k: np.linalg.norm(np.nan_to_num(self._entries[k][1], posinf=1e30, neginf=-1e30) - data))
+        self.near_hits += 1
+        return self._entries[key][2]
+
+    def put(self, key: str, structure: str, data: np.ndarray, entry):
+        """Stores an entry in memory (evicting the least recently used ones) and on disk."""
+        self._insert(key, structure, data, entry)
+        if self.path is not None:
+            tmp = self._file(key) + '.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump((structure, data, entry), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._file(key))
+
+    def _insert(self, key, structure, data, entry):
+        self._entries[key] = (structure, data, entry)
+        self._entries.move_to_end(key)
+        self._by_structure.setdefault(structure, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old, (old_structure, _, _) = self._entries.popitem(last=False)
+            self._by_structure[old_structure].discard(old)
+            if not self._by_structure[old_structure]:
+                del self._by_structure[old_structure]
+
+    def clear(self, disk: bool = False):
+        """Empties the memory cache and, if disk is True, the on-disk store."""
+        self._entries.clear()
+        self._by_structure.clear()
+        if disk and self.path is not None:
+            for name in os.listdir(self.path):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.path, name))
+
+    def __len__(self):
+        return len(self._entries)
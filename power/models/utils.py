@@ -0,0 +1,32 @@
+"""
+Small helpers shared by the result types and the parallel runners.
+"""
+import os
+import numpy as np
+from dataclasses import fields
+
+
+class FrozenArrays:
+    """
+    Mixin for frozen dataclasses whose NumPy fields are made read-only on creation, so that results and
+    cached views can be shared without copies. Subclasses that need a __post_init__ of their own call super().
+    """
+    def __post_init__(self):
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+
+
+def pandas():
+    """
+    The pandas module, imported on first use: `import power` does not load it (see benchmarks/import_time.py),
+    only the to_frame() views of the results do.
+    """
+    import pandas as pd
+    return pd
+
+
+def default_workers() -> int:
+    """Number of CPUs this process may run on (its affinity where the OS reports it)."""
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()